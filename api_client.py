@@ -1,5 +1,151 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from cache import ResponseCache, MISSING
+from catalog import line_code, line_color
+from resilience import TokenBucket, CircuitBreaker, backoff_delay
+import tracing
+
+
+class RequestRefusedError(requests.ConnectionError):
+    """
+    The client refused to send a request (nothing went on the wire);
+    cached data may still be served instead.
+    """
+
+
+class CircuitOpenError(RequestRefusedError):
+    """
+    The EMT API failed repeatedly; requests are refused for a while.
+    """
+
+
+class ThrottledError(RequestRefusedError):
+    """
+    The client-side rate limit did not free up in time.
+    """
+
+
+# Next to the sources, whatever the working directory
+TOKEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "token.txt")
+
+
+# ----------------------------------------------------
+# Shared helpers (also used by async_api_client)
+# ----------------------------------------------------
+def load_token(path=TOKEN_PATH):
+    """
+    Reads token.txt and returns its content.
+    Required for all EMT API requests.
+    """
+    if not os.path.exists(path):
+        raise RuntimeError("Missing token.txt file.")
+
+    with open(path, "r", encoding="utf-8") as f:
+        token = f.read().strip()
+
+    if not token:
+        raise RuntimeError("token.txt is empty.")
+
+    return token
+
+
+def default_headers(token):
+    """
+    HTTP headers with the authorization token.
+    """
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json, text/plain, */*",
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/141.0.0.0 Safari/537.36"
+        ),
+        "Connection": "keep-alive",
+    }
+
+
+def cache_key(template, params, path):
+    """
+    Hashable identity of a request: template + path args + query params.
+    """
+    return (
+        template,
+        tuple(sorted((k, str(v)) for k, v in path.items())),
+        tuple(sorted((k, str(v)) for k, v in (params or {}).items())),
+    )
+
+
+def unwrap_lines(data):
+    """
+    /lines/ answers either {"lines": [...]} or a bare list.
+    """
+    return data.get("lines", []) if isinstance(data, dict) else data
+
+
+def line_colors(lines):
+    """
+    Return dict mapping line code → line color.
+    """
+    colors = {}
+
+    for line in lines:
+        code = line_code(line)
+        if code:
+            colors[code] = line_color(line, "#aaaaaa")
+
+    return colors
+
+
+def check_arrivals_status(status_code):
+    """
+    Map /stops/{id}/timestr error codes to the exceptions the UI shows.
+    """
+    if status_code == 404:
+        raise LookupError("Stop not found.")
+    if status_code == 401:
+        raise PermissionError("Invalid token.")
+
+
+def _setup_time(trace):
+    """
+    Connection setup (socket + TLS) time recorded so far in a trace.
+    """
+    if trace is None:
+        return 0.0
+    return trace.phases.get("connect", 0.0) + trace.phases.get("tls", 0.0)
+
+
+def parse_arrival_times(data):
+    """
+    Turn a /stops/{id}/timestr payload into (line, destination, seconds).
+    """
+    if not isinstance(data, list):
+        raise ValueError("Unexpected format returned by server.")
+
+    arrivals = []
+    for entry in data:
+        line_name = str(entry.get("lineCode", "?"))
+
+        for vehicle in entry.get("vehicles", []):
+            dest = vehicle.get("destination", "Unknown")
+            seconds = max(0, int(vehicle.get("seconds", 0) or 0))
+            arrivals.append((line_name, dest, seconds))
+
+    return arrivals
+
+
+def eta_minutes(seconds):
+    """
+    Whole minutes shown for an arrival (never negative).
+    """
+    return max(0, round(seconds / 60))
 
 
 class ApiClient:
@@ -10,10 +156,95 @@ class ApiClient:
 
     BASE = "https://www.emtpalma.cat/maas/api/v1/agency"
     TIMEOUT = 10
+    POOL_SIZE = 10
+
+    # (connect, read) timeouts per endpoint template.
+    # Arrivals must feel live; shapes can be large and slow to download.
+    TIMEOUTS = {
+        "/lines/": (3.05, 10),
+        "/stops/{stop_id}/timestr": (3.05, 5),
+        "/lines/{line_id}/sublines": (3.05, 8),
+        "/lines/directions-subline": (3.05, 8),
+        "/lines/{line_id}/stops": (3.05, 10),
+        "/lines/{line_id}/shape": (3.05, 15),
+    }
+
+    # Seconds a response stays in the memory cache (0 = never cached).
+    # Network structure changes at most daily; arrivals are live data.
+    CACHE_TTLS = {
+        "/lines/": 24 * 3600,
+        "/stops/{stop_id}/timestr": 5,
+        "/lines/{line_id}/sublines": 24 * 3600,
+        "/lines/directions-subline": 24 * 3600,
+        "/lines/{line_id}/stops": 24 * 3600,
+        "/lines/{line_id}/shape": 7 * 24 * 3600,
+    }
 
-    def __init__(self):
+    # Endpoints mirrored to the on-disk NetworkSnapshot
+    SNAPSHOT_TEMPLATES = frozenset({
+        "/lines/",
+        "/lines/{line_id}/sublines",
+        "/lines/directions-subline",
+        "/lines/{line_id}/stops",
+        "/lines/{line_id}/shape",
+    })
+
+    # Memory-cache lifetime of a snapshot entry the server has not
+    # confirmed yet: the next request for it after that re-issues the
+    # revalidation (MainWindow asks again for /lines/ every STALE_RETRY s
+    # while offline)
+    STALE_RETRY = 60
+
+    # Fixed query flags for the route stops endpoint
+    ROUTE_STOPS_PARAMS = {"isLine": 0, "isLineNearStop": 0, "both": 1}
+
+    # Client-wide request budget (requests/s, burst) and the longest a
+    # request waits for it before giving up
+    RATE_LIMIT = 10
+    RATE_BURST = 20
+    THROTTLE_WAIT = 5
+
+    # Circuit breaker: consecutive failed requests before failing fast,
+    # and seconds before a probe request is let through
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 30
+
+    # Retries of a GET on timeouts, connection errors and these statuses
+    RETRIES = 2
+    RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+    RETRY_BACKOFF = 0.3
+
+    # How old cached data may be when served during an outage
+    # (None = any age); arrivals go stale quickly
+    MAX_STALE = {"/stops/{stop_id}/timestr": 120}
+
+    def __init__(self, base=None, pool_size=POOL_SIZE, cache=None, snapshot=None, tracer=None):
         # Load the Bearer token from token.txt
         self.token = self._load_token()
+        self.base = base or self.BASE
+
+        # Per-endpoint timings (connect, TLS, TTFB, download, parse)
+        self.tracer = tracer or tracing.tracer
+
+        # One pooled keep-alive session shared by every request
+        self.session = self._build_session(pool_size)
+
+        # Decoded responses of static endpoints, keyed by template + args
+        self.cache = cache if cache is not None else ResponseCache()
+
+        # Optional NetworkSnapshot: served instantly at boot, then
+        # revalidated against the server on a background thread
+        self.snapshot = snapshot
+        self.stale = {}   # cache key → fetched_at of unconfirmed disk data
+        self._revalidating = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+
+        # Shared by every endpoint, including background revalidation
+        self.limiter = TokenBucket(self.RATE_LIMIT, self.RATE_BURST)
+        self.breaker = CircuitBreaker(self.FAILURE_THRESHOLD, self.RESET_TIMEOUT)
+        self.retries = 0
+        self.served_stale = 0
 
     # ----------------------------------------------------
     # TOKEN / HEADERS
@@ -23,40 +254,256 @@ class ApiClient:
         Reads token.txt and returns its content.
         Required for all EMT API requests.
         """
-        if not os.path.exists("token.txt"):
-            raise RuntimeError("Missing token.txt file.")
+        return load_token()
 
-        with open("token.txt", "r", encoding="utf-8") as f:
-            token = f.read().strip()
+    def _headers(self):
+        """
+        HTTP headers with the authorization token.
+        """
+        return default_headers(self.token)
 
-        if not token:
-            raise RuntimeError("token.txt is empty.")
+    # ----------------------------------------------------
+    # TRANSPORT
+    # ----------------------------------------------------
+    def _build_session(self, pool_size):
+        """
+        Session with a connection pool and the default headers
+        computed once, so sockets and TLS sessions are reused.
+        """
+        session = requests.Session()
+        session.headers.update(self._headers())
 
-        return token
+        adapter = tracing.instrument_adapter(
+            HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
-    def _headers(self):
+    def _get(self, template, params=None, headers=None, **path):
         """
-        HTTP headers with the authorization token.
+        GET an endpoint given its path template, e.g.
+        _get("/lines/{line_id}/shape", params, line_id=3).
+
+        Goes through the rate limiter and circuit breaker; timeouts,
+        connection errors and 429/5xx answers are retried with jittered
+        exponential backoff (every endpoint is an idempotent GET).
+        """
+        url = self.base + template.format(**path)
+        timeout = self.TIMEOUTS.get(template, self.TIMEOUT)
+
+        # Breaker first: an open circuit fails fast without waiting for a token
+        if not self.breaker.allow():
+            raise CircuitOpenError("EMT API unavailable, retrying shortly.")
+        if not self.limiter.acquire(timeout=self.THROTTLE_WAIT):
+            self.breaker.release()
+            raise ThrottledError("Too many requests to the EMT API.")
+
+        for attempt in range(self.RETRIES + 1):
+            if attempt:
+                self.retries += 1
+                time.sleep(backoff_delay(attempt - 1, self.RETRY_BACKOFF))
+                if not self.limiter.acquire(timeout=self.THROTTLE_WAIT):
+                    # The previous attempt failed and cannot be retried
+                    self.breaker.record_failure()
+                    raise ThrottledError("Too many requests to the EMT API.")
+
+            try:
+                resp = self._send(url, params, headers, timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.RETRIES:
+                    self.breaker.record_failure()
+                    raise
+                continue
+            except Exception:
+                # Truncated or undecodable body (ChunkedEncodingError…):
+                # not retried, but it must still settle a half-open probe
+                self.breaker.record_failure()
+                raise
+
+            if resp.status_code in self.RETRY_STATUS and attempt < self.RETRIES:
+                continue
+            break
+
+        if resp.status_code >= 500 or resp.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return resp
+
+    def _send(self, url, params, headers, timeout):
+        """
+        One HTTP attempt, split into time to first byte and body download
+        for the current trace (connect / TLS are added by the transport).
+        """
+        trace = self.tracer.current()
+        setup_before = _setup_time(trace)
+
+        start = time.perf_counter()
+        resp = self.session.get(url, params=params, headers=headers,
+                                timeout=timeout, stream=True)
+        if trace is not None:
+            setup = _setup_time(trace) - setup_before
+            trace.add("ttfb", time.perf_counter() - start - setup)
+            trace.status = resp.status_code
+
+        with self.tracer.phase("download"):
+            resp.content
+        return resp
+
+    def _get_json(self, template, params=None, check_status=None, **path):
+        """
+        GET an endpoint and return decoded JSON, served from the cache
+        while the entry is fresh. check_status(status_code) may raise
+        endpoint-specific errors before the generic HTTP error.
+        """
+        with self.tracer.trace(template) as trace:
+            return self._get_json_traced(trace, template, params, check_status, path)
+
+    def _get_json_traced(self, trace, template, params, check_status, path):
+        ttl = self.CACHE_TTLS.get(template, 0)
+        key = cache_key(template, params, path)
+
+        if ttl:
+            data = self.cache.get(key)
+            if data is MISSING:
+                data = self._from_snapshot(template, params, path, key, ttl)
+            if data is not MISSING:
+                trace.outcome = "cache"
+                return data
+
+        try:
+            resp = self._get(template, params, **path)
+        except RequestRefusedError:
+            # Breaker open or throttled: fail fast, but keep showing what we had
+            data = self.cache.get_stale(key, self.MAX_STALE.get(template)) if ttl else MISSING
+            if data is MISSING:
+                raise
+            self.served_stale += 1
+            trace.outcome = "cache"
+            return data
+
+        if check_status:
+            check_status(resp.status_code)
+        resp.raise_for_status()
+        with self.tracer.phase("parse"):
+            data = resp.json()
+
+        if ttl:
+            self.cache.put(key, data, ttl, len(resp.content))
+            self._save_snapshot(template, key, data, resp)
+        return data
+
+    # ----------------------------------------------------
+    # ON-DISK SNAPSHOT
+    # ----------------------------------------------------
+    def _from_snapshot(self, template, params, path, key, ttl):
+        """
+        Serve a response stored on disk. Entries older than their TTL
+        are still returned (marked stale) and revalidated in background.
+        """
+        if self.snapshot is None or template not in self.SNAPSHOT_TEMPLATES:
+            return MISSING
+
+        entry = self.snapshot.load(key)
+        if entry is None:
+            return MISSING
+
+        age = time.time() - entry.fetched_at
+        if age < ttl:
+            self.cache.put(key, entry.data, ttl - age, entry.size)
+            return entry.data
+
+        self.stale[key] = entry.fetched_at
+        self.cache.put(key, entry.data, self.STALE_RETRY, entry.size)
+
+        with self._lock:
+            if key not in self._revalidating:
+                self._revalidating[key] = self._executor.submit(
+                    self._revalidate, template, params, path, key, entry
+                )
+        return entry.data
+
+    def _revalidate(self, template, params, path, key, entry):
+        """
+        Conditional GET for a stale snapshot entry (runs off the GUI thread).
+        On failure the stale copy keeps being served.
+        """
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            with self.tracer.trace(template):
+                resp = self._get(template, params, headers=headers, **path)
+
+                if resp.status_code == 304:
+                    self.snapshot.touch(key)
+                    data, size = entry.data, entry.size
+                else:
+                    resp.raise_for_status()
+                    with self.tracer.phase("parse"):
+                        data = resp.json()
+                    size = len(resp.content)
+                    self._save_snapshot(template, key, data, resp)
+
+            self.cache.put(key, data, self.CACHE_TTLS[template], size)
+            self.stale.pop(key, None)
+        except (requests.RequestException, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._revalidating.pop(key, None)
+
+    def _save_snapshot(self, template, key, data, resp):
+        if self.snapshot is None or template not in self.SNAPSHOT_TEMPLATES:
+            return
+        self.snapshot.save(
+            key, data,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+
+    def stale_since(self, template, params=None, **path):
+        """
+        fetched_at (epoch seconds) if the response currently served for
+        this request comes from disk and is not yet confirmed, else None.
+        """
+        return self.stale.get(cache_key(template, params, path))
+
+    def is_revalidating(self, template, params=None, **path):
+        return cache_key(template, params, path) in self._revalidating
+
+    def resilience_stats(self):
+        """
+        Rate limiter / retry / circuit breaker counters.
         """
         return {
-            "Authorization": f"Bearer {self.token}",
-            "Accept": "application/json, text/plain, */*",
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/141.0.0.0 Safari/537.36"
-            ),
+            "breaker": self.breaker.metrics(),
+            "retries": self.retries,
+            "served_stale": self.served_stale,
         }
 
+    def invalidate(self, template=None):
+        """
+        Forget cached responses (all, or one endpoint template).
+        """
+        self.cache.invalidate(template)
+
+    def close(self):
+        """
+        Release pooled connections and background workers.
+        """
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
     # ----------------------------------------------------
     # LINE LIST (raw) — used for Tab 2
     # ----------------------------------------------------
     def get_lines_raw(self):
-        url = f"{self.BASE}/lines/"
-        resp = requests.get(url, headers=self._headers(), timeout=self.TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("lines", []) if isinstance(data, dict) else data
+        return unwrap_lines(self._get_json("/lines/"))
 
     # ----------------------------------------------------
     # LINE COLORS (for Tab 1)
@@ -66,32 +513,7 @@ class ApiClient:
         Return dict mapping line code → line color.
         Used to render colored badges in Tab 1.
         """
-        url = f"{self.BASE}/lines/"
-        resp = requests.get(url, headers=self._headers(), timeout=self.TIMEOUT)
-        resp.raise_for_status()
-
-        data = resp.json()
-        if isinstance(data, dict):
-            data = data.get("lines", [])
-
-        colors = {}
-
-        for line in data:
-            code = line.get("code") or line.get("shortName") or ""
-            if not code:
-                continue
-
-            # EMT provides either full hex (#123456) or raw hex ("123456")
-            raw_color = line.get("color")
-            if raw_color and raw_color.startswith("#"):
-                color = raw_color
-            else:
-                rc = line.get("routeColor")
-                color = f"#{rc}" if rc else "#aaaaaa"
-
-            colors[code] = color
-
-        return colors
+        return line_colors(self.get_lines_raw())
 
     # ----------------------------------------------------
     # STOP ARRIVALS — Tab 1
@@ -100,54 +522,33 @@ class ApiClient:
         """
         Calls /stops/{id}/timestr and parses the arrivals.
         """
+        return [(line, dest, eta_minutes(seconds))
+                for line, dest, seconds in self.get_arrival_times(stop_id)]
+
+    def get_arrival_times(self, stop_id):
+        """
+        Arrivals of a stop as (line, destination, seconds).
+        """
         if not stop_id.isdigit():
             raise ValueError("Stop number must be numeric.")
 
-        url = f"{self.BASE}/stops/{stop_id}/timestr"
-        resp = requests.get(url, headers=self._headers(), timeout=self.TIMEOUT)
-
-        if resp.status_code == 404:
-            raise LookupError("Stop not found.")
-        if resp.status_code == 401:
-            raise PermissionError("Invalid token.")
-
-        resp.raise_for_status()
-        data = resp.json()
-
-        if not isinstance(data, list):
-            raise ValueError("Unexpected format returned by server.")
-
-        arrivals = []
-        for entry in data:
-            line_name = str(entry.get("lineCode", "?"))
-
-            for vehicle in entry.get("vehicles", []):
-                dest = vehicle.get("destination", "Unknown")
-                seconds = vehicle.get("seconds", 0)
-                eta_min = max(0, round(seconds / 60))
-                arrivals.append((line_name, dest, eta_min))
-
-        return arrivals
+        data = self._get_json("/stops/{stop_id}/timestr",
+                              check_status=check_arrivals_status,
+                              stop_id=stop_id)
+        return parse_arrival_times(data)
 
     # ----------------------------------------------------
     # SUBLINES (Tab 2 — first click)
     # ----------------------------------------------------
     def get_sublines(self, line_id):
-        url = f"{self.BASE}/lines/{line_id}/sublines"
-        resp = requests.get(url, headers=self._headers(), timeout=self.TIMEOUT)
-        resp.raise_for_status()
-        return resp.json()
+        return self._get_json("/lines/{line_id}/sublines", line_id=line_id)
 
     # ----------------------------------------------------
     # DIRECTIONS FOR SUBLINE (Tab 2 — second click)
     # ----------------------------------------------------
     def get_directions_for_subline(self, subline_id):
-        url = f"{self.BASE}/lines/directions-subline"
         params = {"subLineId": subline_id}
-        resp = requests.get(url, headers=self._headers(),
-                            params=params, timeout=self.TIMEOUT)
-        resp.raise_for_status()
-        return resp.json()
+        return self._get_json("/lines/directions-subline", params)
 
     # ----------------------------------------------------
     # ROUTE STOPS FOR TRIP (used by map)
@@ -158,21 +559,8 @@ class ApiClient:
         /lines/{lineId}/stops?tripId=...&isLine=0&isLineNearStop=0&both=1
         Returns raw list of stops.
         """
-        url = f"{self.BASE}/lines/{line_id}/stops"
-        params = {
-            "tripId": trip_id,
-            "isLine": 0,
-            "isLineNearStop": 0,
-            "both": 1,
-        }
-        resp = requests.get(
-            url,
-            headers=self._headers(),
-            params=params,
-            timeout=self.TIMEOUT,
-        )
-        resp.raise_for_status()
-        return resp.json()
+        params = {"tripId": trip_id, **self.ROUTE_STOPS_PARAMS}
+        return self._get_json("/lines/{line_id}/stops", params, line_id=line_id)
 
     # ----------------------------------------------------
     # ROUTE SHAPE FOR TRIP (used by map)
@@ -183,13 +571,5 @@ class ApiClient:
         /lines/{lineId}/shape?tripId=...
         Returns raw list of shape points.
         """
-        url = f"{self.BASE}/lines/{line_id}/shape"
         params = {"tripId": trip_id}
-        resp = requests.get(
-            url,
-            headers=self._headers(),
-            params=params,
-            timeout=self.TIMEOUT,
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return self._get_json("/lines/{line_id}/shape", params, line_id=line_id)
@@ -0,0 +1,137 @@
+/*
+ * Stop markers for the route and network maps.
+ *
+ * Stops are drawn as circle markers on one shared canvas (no DOM node per
+ * stop), popups and tooltips are built only when opened, and nearby stops
+ * are merged into clusters on a pixel grid that is rebuilt on zoom.
+ *
+ *   let stops = new StopLayer(map, {onSelect: id => ...});
+ *   stops.setStops([{id, lat, lon, name}, ...]);
+ */
+(function () {
+    // Grid cell (px) used to cluster large stop sets below SPREAD_ZOOM
+    const CLUSTER_CELL = 60;
+    // Smaller cell that only merges stops drawn on top of each other
+    const OVERLAP_CELL = 14;
+    // Stop count from which the large cell is used
+    const CLUSTER_MIN_STOPS = 150;
+    // From this zoom on every stop is drawn on its own
+    const SPREAD_ZOOM = 16;
+
+    function StopLayer(map, options) {
+        options = options || {};
+        this.map = map;
+        this.onSelect = options.onSelect || function () {};
+        this.clusterMin = options.clusterMin || CLUSTER_MIN_STOPS;
+        this.renderer = L.canvas({padding: 0.5});
+        this.layer = L.layerGroup().addTo(map);
+        this.stops = [];
+        map.on('zoomend', () => this.redraw());
+    }
+
+    StopLayer.prototype.setStops = function (stops) {
+        this.stops = stops || [];
+        this.redraw();
+    };
+
+    StopLayer.prototype.clear = function () {
+        this.setStops([]);
+    };
+
+    StopLayer.prototype.redraw = function () {
+        this.layer.clearLayers();
+        if (!this.stops.length) return;
+
+        let zoom = this.map.getZoom();
+        let dense = this.stops.length >= this.clusterMin && zoom < SPREAD_ZOOM;
+        let cell = dense ? CLUSTER_CELL : OVERLAP_CELL;
+
+        // Greedy grid clustering: a stop joins the first cluster whose seed
+        // is less than one cell away (checking the 3x3 neighbouring cells),
+        // otherwise it seeds a new cluster in its own cell.
+        let cells = new Map();
+        let clusters = [];
+        this.stops.forEach(s => {
+            let p = this.map.project([s.lat, s.lon], zoom);
+            let cx = Math.floor(p.x / cell), cy = Math.floor(p.y / cell);
+            let found = null;
+            for (let dx = -1; dx <= 1 && !found; dx++) {
+                for (let dy = -1; dy <= 1 && !found; dy++) {
+                    let near = cells.get((cx + dx) + ':' + (cy + dy)) || [];
+                    found = near.find(c => Math.abs(c.x - p.x) < cell && Math.abs(c.y - p.y) < cell);
+                }
+            }
+            if (found) {
+                found.stops.push(s);
+                return;
+            }
+            let cluster = {x: p.x, y: p.y, stops: [s]};
+            clusters.push(cluster);
+            let key = cx + ':' + cy;
+            if (cells.has(key)) cells.get(key).push(cluster); else cells.set(key, [cluster]);
+        });
+
+        clusters.forEach(({stops: group}) => {
+            if (group.length === 1) {
+                this._stopMarker(group[0]);
+            } else {
+                this._clusterMarker(group, !dense);
+            }
+        });
+    };
+
+    StopLayer.prototype._stopMarker = function (s) {
+        L.circleMarker([s.lat, s.lon], {
+            renderer: this.renderer,
+            radius: 6,
+            weight: 2,
+            color: '#ffffff',
+            fillColor: '#2563eb',
+            fillOpacity: 0.9,
+        })
+            .bindTooltip(() => s.id + ' - ' + s.name)
+            .bindPopup(() => this._stopPopup([s]))
+            .addTo(this.layer);
+    };
+
+    StopLayer.prototype._clusterMarker = function (group, overlapping) {
+        let lat = 0, lon = 0;
+        group.forEach(s => { lat += s.lat; lon += s.lon; });
+        let center = [lat / group.length, lon / group.length];
+
+        let marker = L.circleMarker(center, {
+            renderer: this.renderer,
+            radius: Math.min(8 + 3 * Math.log2(group.length), 24),
+            weight: 2,
+            color: '#ffffff',
+            fillColor: '#f97316',
+            fillOpacity: 0.9,
+        }).bindTooltip(() => group.length + ' paradas');
+
+        if (overlapping) {
+            // Cannot be separated by zooming: list them instead
+            marker.bindPopup(() => this._stopPopup(group));
+        } else {
+            let bounds = L.latLngBounds(group.map(s => [s.lat, s.lon]));
+            marker.on('click', () => this.map.fitBounds(bounds, {padding: [40, 40], maxZoom: SPREAD_ZOOM}));
+        }
+        marker.addTo(this.layer);
+    };
+
+    StopLayer.prototype._stopPopup = function (stops) {
+        // Built as DOM nodes: stop names never go through innerHTML
+        let div = document.createElement('div');
+        stops.forEach((s, i) => {
+            if (i) div.append(document.createElement('hr'));
+            let title = document.createElement('b');
+            title.textContent = s.name;
+            let button = document.createElement('button');
+            button.textContent = 'Consultar parada ' + s.id;
+            button.onclick = () => this.onSelect(s.id);
+            div.append(title, document.createElement('br'), button);
+        });
+        return div;
+    };
+
+    window.StopLayer = StopLayer;
+})();
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+
+import aiohttp
+
+from api_client import (
+    ApiClient, load_token, default_headers, cache_key, unwrap_lines,
+    line_colors, check_arrivals_status, parse_arrival_times, eta_minutes,
+)
+from cache import MISSING
+
+
+class AsyncApiClient:
+    """
+    Experimental asyncio counterpart of ApiClient, standalone: the app
+    does not use it. Same endpoints and parsing, with requests run
+    concurrently over one pooled aiohttp session, bounded by a semaphore.
+
+    Unlike ApiClient it has no rate limiter, circuit breaker, retries or
+    snapshot, and transport errors are aiohttp's own (ClientResponseError,
+    ClientConnectionError, asyncio.TimeoutError), not requests exceptions.
+    Only LookupError / PermissionError / ValueError match ApiClient.
+
+    From a script:
+        async with AsyncApiClient() as api:
+            results = await api.get_arrivals_many(["42", "113"])
+
+    From Qt, run it on an AsyncLoopThread (see below).
+    """
+
+    BASE = ApiClient.BASE
+    TIMEOUTS = ApiClient.TIMEOUTS
+    TIMEOUT = ApiClient.TIMEOUT
+    CACHE_TTLS = ApiClient.CACHE_TTLS
+    ROUTE_STOPS_PARAMS = ApiClient.ROUTE_STOPS_PARAMS
+
+    def __init__(self, base=None, pool_size=ApiClient.POOL_SIZE, max_concurrency=8,
+                 cache=None):
+        self.token = load_token()
+        self.base = base or self.BASE
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+
+        # Optional ResponseCache, e.g. shared with a sync ApiClient
+        self.cache = cache
+
+        # Created lazily: both must belong to the running event loop
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ----------------------------------------------------
+    # TRANSPORT
+    # ----------------------------------------------------
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=default_headers(self.token),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _timeout(self, template):
+        t = self.TIMEOUTS.get(template, self.TIMEOUT)
+        if isinstance(t, tuple):
+            connect, read = t
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=t)
+
+    async def _get_json(self, template, params=None, check_status=None, **path):
+        """
+        GET an endpoint by path template and return decoded JSON.
+        check_status(status_code) may raise before the generic HTTP error.
+        """
+        ttl = self.CACHE_TTLS.get(template, 0) if self.cache is not None else 0
+        key = cache_key(template, params, path)
+
+        if ttl:
+            data = self.cache.get(key)
+            if data is not MISSING:
+                return data
+
+        session = self._get_session()
+        url = self.base + template.format(**path)
+
+        async with self._semaphore:
+            async with session.get(url, params=params,
+                                   timeout=self._timeout(template)) as resp:
+                if check_status:
+                    check_status(resp.status)
+                resp.raise_for_status()
+                body = await resp.read()
+                # EMT does not always label JSON correctly
+                data = await resp.json(content_type=None)
+
+        if ttl:
+            self.cache.put(key, data, ttl, len(body))
+        return data
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ----------------------------------------------------
+    # ENDPOINTS (mirror ApiClient)
+    # ----------------------------------------------------
+    async def get_lines_raw(self):
+        return unwrap_lines(await self._get_json("/lines/"))
+
+    async def get_lines(self):
+        return line_colors(await self.get_lines_raw())
+
+    async def get_arrivals(self, stop_id):
+        return [(line, dest, eta_minutes(seconds))
+                for line, dest, seconds in await self.get_arrival_times(stop_id)]
+
+    async def get_arrival_times(self, stop_id):
+        if not stop_id.isdigit():
+            raise ValueError("Stop number must be numeric.")
+
+        data = await self._get_json("/stops/{stop_id}/timestr",
+                                    check_status=check_arrivals_status,
+                                    stop_id=stop_id)
+        return parse_arrival_times(data)
+
+    async def get_sublines(self, line_id):
+        return await self._get_json("/lines/{line_id}/sublines", line_id=line_id)
+
+    async def get_directions_for_subline(self, subline_id):
+        params = {"subLineId": subline_id}
+        return await self._get_json("/lines/directions-subline", params)
+
+    async def get_route_stops(self, line_id, trip_id):
+        params = {"tripId": trip_id, **self.ROUTE_STOPS_PARAMS}
+        return await self._get_json("/lines/{line_id}/stops", params, line_id=line_id)
+
+    async def get_route_shape(self, line_id, trip_id):
+        params = {"tripId": trip_id}
+        return await self._get_json("/lines/{line_id}/shape", params, line_id=line_id)
+
+    # ----------------------------------------------------
+    # FAN-OUT
+    # ----------------------------------------------------
+    async def get_arrivals_many(self, stop_ids):
+        """
+        Fetch several stops at once.
+        Returns {stop_id: arrivals or the exception raised for that stop}.
+        """
+        stop_ids = list(dict.fromkeys(stop_ids))
+        results = await asyncio.gather(
+            *(self.get_arrivals(s) for s in stop_ids),
+            return_exceptions=True,
+        )
+        return dict(zip(stop_ids, results))
+
+
+class AsyncLoopThread:
+    """
+    Runs an asyncio event loop in a daemon thread so synchronous code
+    (e.g. Qt slots) can submit coroutines without blocking.
+
+        loop = AsyncLoopThread()
+        future = loop.submit(api.get_arrivals_many(ids))
+        future.add_done_callback(...)   # called on the loop thread
+
+    Qt code must hop back to the GUI thread (signal or
+    QMetaObject.invokeMethod) before touching widgets.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine; returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Schedule a coroutine and wait for its result.
+        """
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
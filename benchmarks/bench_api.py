@@ -0,0 +1,44 @@
+"""
+ApiClient: one request per endpoint through the whole stack (rate limiter,
+breaker, pooled session, JSON decoding, tracing), and the parsers alone.
+Network benchmarks empty the memory cache before every round.
+"""
+from api_client import cache_key, parse_arrival_times, unwrap_lines
+
+ROUNDS = 100
+
+
+def bench_get_lines(benchmark, api):
+    assert benchmark.pedantic(api.get_lines_raw, setup=api.invalidate, rounds=ROUNDS)
+
+
+def bench_get_arrival_times(benchmark, api):
+    assert benchmark.pedantic(api.get_arrival_times, args=("42",),
+                              setup=api.invalidate, rounds=ROUNDS)
+
+
+def bench_get_route_stops(benchmark, api):
+    assert benchmark.pedantic(api.get_route_stops, args=(3, 9001),
+                              setup=api.invalidate, rounds=ROUNDS)
+
+
+def bench_get_route_shape(benchmark, api):
+    assert benchmark.pedantic(api.get_route_shape, args=(3, 9001),
+                              setup=api.invalidate, rounds=ROUNDS)
+
+
+def bench_get_route_shape_cached(benchmark, api):
+    api.get_route_shape(3, 9001)
+    assert benchmark(api.get_route_shape, 3, 9001)
+
+
+def bench_parse_arrival_times(benchmark, fixtures):
+    assert benchmark(parse_arrival_times, fixtures.arrivals)
+
+
+def bench_unwrap_lines(benchmark, fixtures):
+    assert benchmark(unwrap_lines, {"lines": fixtures.lines})
+
+
+def bench_cache_key(benchmark):
+    benchmark(cache_key, "/lines/{line_id}/stops", {"tripId": 9001, "isLine": 0}, {"line_id": 3})
@@ -0,0 +1,49 @@
+"""
+Map window: folium page build and route switching. Skipped where
+QtWebEngine cannot be loaded.
+"""
+import pytest
+
+pytest.importorskip("PyQt6.QtWebEngineWidgets", exc_type=ImportError)
+
+from model import parse_route_stops
+
+
+@pytest.fixture(scope="module")
+def route(fixtures):
+    stops = parse_route_stops(fixtures.stops)
+    shape = [(p["latitude"], p["longitude"]) for p in fixtures.shape]
+    return stops, shape
+
+
+@pytest.fixture(scope="module")
+def map_window(qapp, route):
+    from map_window import MapWindow
+
+    win = MapWindow("3", *route)
+    yield win
+    win.close()
+
+
+def bench_build_folium_map(benchmark, map_window, route):
+    html = benchmark(map_window._build_folium_map, "3", *route)
+    assert "L.map" in html or "leaflet" in html.lower()
+
+
+def bench_map_window(benchmark, qapp, route):
+    from map_window import MapWindow
+
+    def open_and_close():
+        win = MapWindow("3", *route)
+        win.close()
+        win.deleteLater()
+
+    benchmark.pedantic(open_and_close, rounds=10)
+
+
+def bench_map_host_show_route(benchmark, qapp, route):
+    from map_host import MapHost
+
+    host = MapHost()
+    benchmark(host.show_route, "3", *route)
+    host.close()
@@ -0,0 +1,51 @@
+"""
+BusModel: formatting and parsing on top of ApiClient, with the response
+already cached (bench_format_*) or fetched every round.
+"""
+import pytest
+
+from model import parse_route_stops
+
+STOP = "42"
+
+
+def bench_format_arrivals(benchmark, model):
+    def warm():
+        # Every round, so the 5 s arrivals TTL cannot expire mid-run
+        model.api.get_arrival_times(STOP)
+
+    result = benchmark.pedantic(model.fetch_arrivals, args=(STOP,), setup=warm, rounds=200)
+    assert result["data"]
+
+
+def bench_fetch_arrivals(benchmark, model):
+    result = benchmark.pedantic(model.fetch_arrivals, args=(STOP,),
+                                setup=model.api.invalidate, rounds=100)
+    assert result["data"]
+
+
+@pytest.mark.parametrize("stops", [5, 20])
+def bench_fetch_arrivals_many(benchmark, model, stops):
+    stop_ids = [str(100 + i) for i in range(stops)]
+    result = benchmark.pedantic(model.fetch_arrivals_many, args=(stop_ids,),
+                                setup=model.api.invalidate, rounds=30)
+    assert not result["errors"]
+
+
+def bench_format_route_shape(benchmark, model, fixtures):
+    model.get_route_shape(3, 9001)
+    assert len(benchmark(model.get_route_shape, 3, 9001)) == len(fixtures.shape)
+
+
+def bench_format_route_stops(benchmark, model):
+    model.get_route_stops(3, 9001)
+    assert benchmark(model.get_route_stops, 3, 9001)
+
+
+def bench_parse_route_stops(benchmark, fixtures):
+    assert len(benchmark(parse_route_stops, fixtures.stops)) == len(fixtures.stops)
+
+
+def bench_search_stops(benchmark, model):
+    model.get_route_stops(3, 9001)
+    benchmark(model.search_stops, "parada")
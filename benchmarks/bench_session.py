@@ -0,0 +1,48 @@
+"""
+Per-request latency of the old one-shot requests.get() calls versus the
+pooled keep-alive session used by ApiClient, against a fake server that
+charges a simulated TCP + TLS handshake on every new connection.
+"""
+import pytest
+import requests
+
+from api_client import ApiClient
+from fake_emt_server import start_server
+from resilience import TokenBucket
+
+CONNECT_DELAY = 0.02   # seconds per new connection
+ROUNDS = 50
+
+
+@pytest.fixture(scope="module")
+def handshake_base():
+    server, base = start_server(connect_delay=CONNECT_DELAY)
+    yield base
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def client(handshake_base):
+    api = ApiClient(base=handshake_base)
+    api.limiter = TokenBucket(100_000, 100_000)   # measure the transport, not the rate limit
+    yield api
+    api.close()
+
+
+def bench_one_shot_get(benchmark, handshake_base, client):
+    headers = client._headers()
+
+    def one_shot():
+        # What every ApiClient method used to do
+        resp = requests.get(f"{handshake_base}/stops/42/timestr",
+                            headers=headers, timeout=client.TIMEOUT)
+        resp.raise_for_status()
+        return resp.json()
+
+    assert benchmark.pedantic(one_shot, rounds=ROUNDS)
+
+
+def bench_pooled_get(benchmark, client):
+    # Every call goes to the server, like one_shot
+    assert benchmark.pedantic(client.get_arrivals, args=("42",),
+                              setup=client.invalidate, rounds=ROUNDS)
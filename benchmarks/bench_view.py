@@ -0,0 +1,38 @@
+"""
+MainWindow list population and arrival cards (offscreen, no event loop).
+"""
+import pytest
+
+from fake_emt_server import Fixtures
+
+
+@pytest.fixture(scope="module")
+def window(qapp, model):
+    from view import MainWindow
+
+    win = MainWindow(model)
+    yield win
+    win.close()
+
+
+def bench_populate_lines(benchmark, window, fixtures):
+    window.lines_data = fixtures.lines
+    benchmark(window._populate_lines)
+    assert window.linesModel.rowCount() == len(fixtures.lines)
+
+
+def bench_populate_sublines(benchmark, window):
+    sublines = Fixtures(sublines=100).sublines
+    benchmark(window._populate_sublines, sublines, {"id": 3, "code": "3"})
+    assert window.directionsModel.rowCount() == len(sublines)
+
+
+def bench_populate_directions(benchmark, window):
+    directions = Fixtures(directions=100).directions
+    benchmark(window._populate_directions, directions, "3", 3)
+    assert window.directionsModel.rowCount() == len(directions)
+
+
+def bench_show_arrivals(benchmark, window, model):
+    result = model.fetch_arrivals("42")
+    benchmark(window.show_arrivals, result)
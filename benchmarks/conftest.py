@@ -0,0 +1,99 @@
+"""
+Shared fixtures for the benchmark suite (pytest-benchmark).
+
+Run from this folder:
+    pip install -r requirements.txt
+    python -m pytest --benchmark-autosave            # save a baseline
+    python -m pytest --benchmark-compare             # compare with the last one
+    python -m pytest --emt-latency 0.05 -k api       # slower network
+
+Everything runs against the local fake server (fake_emt_server.py), with
+an empty snapshot per session, so results only depend on the code.
+The project root is put on sys.path by pytest.ini (pythonpath).
+"""
+import os
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# GUI benchmarks need no display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from fake_emt_server import Fixtures, start_server
+
+# The client-side rate limit (10 req/s) would otherwise be what gets measured
+UNLIMITED = 100_000
+
+
+def pytest_configure(config):
+    # Saved baselines stay in benchmarks/.benchmarks whatever the working
+    # directory (runs before pytest-benchmark reads the option)
+    if not any(arg.startswith("--benchmark-storage") for arg in config.invocation_params.args):
+        config.option.benchmark_storage = "file://" + os.path.join(BENCH_DIR, ".benchmarks")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("emt", "fake EMT server")
+    group.addoption("--emt-latency", type=float, default=0.0, help="seconds per response")
+    group.addoption("--emt-connect-delay", type=float, default=0.0,
+                    help="seconds per new connection")
+    group.addoption("--emt-fixtures", default=None, help="directory of recorded fixtures")
+    group.addoption("--emt-lines", type=int, default=50)
+    group.addoption("--emt-arrivals", type=int, default=40, help="vehicles per stop")
+    group.addoption("--emt-stops", type=int, default=60, help="stops per route")
+    group.addoption("--emt-shape-points", type=int, default=2000, help="points per shape")
+
+
+@pytest.fixture(scope="session")
+def fixtures(request):
+    option = request.config.getoption
+    sizes = dict(lines=option("--emt-lines"), arrivals=option("--emt-arrivals"),
+                 stops=option("--emt-stops"), shape_points=option("--emt-shape-points"))
+    directory = option("--emt-fixtures")
+    return Fixtures.load(directory, **sizes) if directory else Fixtures(**sizes)
+
+
+@pytest.fixture(scope="session")
+def base_url(request, fixtures):
+    server, base = start_server(request.config.getoption("--emt-latency"),
+                                request.config.getoption("--emt-connect-delay"),
+                                fixtures)
+    yield base
+    server.shutdown()
+
+
+@pytest.fixture
+def api(base_url):
+    from api_client import ApiClient
+    from resilience import TokenBucket
+
+    client = ApiClient(base=base_url)
+    client.limiter = TokenBucket(UNLIMITED, UNLIMITED)
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def model(base_url, tmp_path_factory):
+    """
+    BusModel wired to the fake server, with a throwaway snapshot and the
+    line catalog already loaded.
+    """
+    import model as model_module
+    from resilience import TokenBucket
+
+    path = str(tmp_path_factory.mktemp("snapshot") / "emt_snapshot.sqlite3")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(model_module.ApiClient, "BASE", base_url)
+        bus_model = model_module.BusModel(snapshot_path=path)
+        bus_model.api.limiter = TokenBucket(UNLIMITED, UNLIMITED)
+        bus_model.wait_catalog(timeout=10)
+    return bus_model
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
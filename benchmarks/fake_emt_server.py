@@ -0,0 +1,278 @@
+"""
+Local stand-in for the EMT MAAS API.
+Serves generated (or recorded) payloads so the HTTP layer, the model and
+the GUI can be measured without touching emtpalma.cat.
+
+Serve it for the crawler or manual runs:
+    python benchmarks/fake_emt_server.py --lines 40 --stops 60 --latency 0.05
+    python crawler.py --base http://127.0.0.1:<port>/maas/api/v1/agency
+
+Record real responses as fixtures (needs token.txt; ApiClient is
+imported from the project root):
+    PYTHONPATH=. python benchmarks/fake_emt_server.py --record benchmarks/fixtures
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+PREFIX = "/maas/api/v1/agency"
+
+LINES = [
+    {"id": 3, "code": "3", "name": "Son Rapinya - Son Gotleu", "color": "#e30613"},
+    {"id": 15, "code": "15", "name": "Sant Agustí - Es Pil·larí", "routeColor": "00a0e3"},
+    {"id": 101, "code": "A1", "name": "Aeroport - Palma", "color": "#f59e0b"},
+]
+
+ARRIVALS = [
+    {"lineCode": "3", "vehicles": [{"destination": "Son Gotleu", "seconds": 130}]},
+    {"lineCode": "15", "vehicles": [{"destination": "Es Pil·larí", "seconds": 420}]},
+]
+
+SUBLINES = [{"subLineId": 301, "longName": "Son Rapinya - Son Gotleu"}]
+
+DIRECTIONS = [
+    {"headSign": "Son Gotleu", "tripId": 9001},
+    {"headSign": "Son Rapinya", "tripId": 9002},
+]
+
+STOPS = [
+    {"stopCode": str(100 + i), "stopName": f"Parada {i}",
+     "stopLat": 39.57 + i * 0.001, "stopLon": 2.65 + i * 0.001}
+    for i in range(20)
+]
+
+SHAPE = [
+    {"latitude": 39.57 + i * 0.0001, "longitude": 2.65 + i * 0.0001}
+    for i in range(200)
+]
+
+STREETS = ("Avinguda Argentina", "Plaça d'Espanya", "Carrer de Manacor", "Passeig Marítim",
+           "Son Dameto", "Via Alemanya", "Carrer de Aragó", "Coll d'en Rabassa")
+
+
+# ----------------------------------------------------
+# Fixtures
+# ----------------------------------------------------
+class Fixtures:
+    """
+    Payloads served by the fake server. The canned lists above come first;
+    larger sizes are filled with deterministic generated entries, so a
+    benchmark run with the same sizes and seed always sees the same data.
+    arrivals counts vehicles at a stop; stops and shape_points are per route.
+    """
+
+    NAMES = ("lines", "arrivals", "sublines", "directions", "stops", "shape")
+
+    def __init__(self, lines=3, arrivals=2, sublines=1, directions=2, stops=20,
+                 shape_points=200, seed=0):
+        rng = random.Random(seed)
+
+        self.lines = LINES[:lines] + [
+            {"id": 200 + i, "code": str(20 + i), "name": f"{rng.choice(STREETS)} - {rng.choice(STREETS)}",
+             "color": "#%06x" % rng.randrange(0x1000000)}
+            for i in range(max(0, lines - len(LINES)))
+        ]
+
+        codes = [line["code"] for line in self.lines] or ["3"]
+        self.arrivals = ARRIVALS[:arrivals]
+        for i in range(max(0, arrivals - len(ARRIVALS))):
+            self.arrivals.append({"lineCode": codes[i % len(codes)], "vehicles": [
+                {"destination": rng.choice(STREETS), "seconds": rng.randrange(30, 3600)},
+            ]})
+
+        self.sublines = SUBLINES[:sublines] + [
+            {"subLineId": 400 + i, "longName": f"{rng.choice(STREETS)} - {rng.choice(STREETS)}"}
+            for i in range(max(0, sublines - len(SUBLINES)))
+        ]
+
+        self.directions = DIRECTIONS[:directions] + [
+            {"headSign": rng.choice(STREETS), "tripId": 9100 + i}
+            for i in range(max(0, directions - len(DIRECTIONS)))
+        ]
+
+        self.stops = STOPS[:stops] + [
+            {"stopCode": str(1000 + i), "stopName": f"{rng.choice(STREETS)} {i}",
+             "stopLat": round(39.52 + rng.random() * 0.12, 6),
+             "stopLon": round(2.58 + rng.random() * 0.16, 6)}
+            for i in range(max(0, stops - len(STOPS)))
+        ]
+
+        self.shape = SHAPE[:shape_points]
+        lat, lon = 39.57 + len(self.shape) * 0.0001, 2.65 + len(self.shape) * 0.0001
+        for _ in range(max(0, shape_points - len(SHAPE))):
+            lat += rng.uniform(-0.0001, 0.00015)
+            lon += rng.uniform(-0.0001, 0.00015)
+            self.shape.append({"latitude": round(lat, 6), "longitude": round(lon, 6)})
+
+    def routes(self):
+        """
+        [(path pattern relative to PREFIX, payload)]
+        """
+        return [
+            (re.compile(r"^/lines/?$"), {"lines": self.lines}),
+            (re.compile(r"^/stops/\d+/timestr$"), self.arrivals),
+            (re.compile(r"^/lines/\d+/sublines$"), self.sublines),
+            (re.compile(r"^/lines/directions-subline$"), self.directions),
+            (re.compile(r"^/lines/\d+/stops$"), self.stops),
+            (re.compile(r"^/lines/\d+/shape$"), self.shape),
+        ]
+
+    @classmethod
+    def load(cls, directory, **sizes):
+        """
+        Fixtures read from <name>.json files (see record); endpoints
+        without a file keep the generated payload.
+        """
+        fixtures = cls(**sizes)
+        for name in cls.NAMES:
+            path = os.path.join(directory, f"{name}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    setattr(fixtures, name, json.load(f))
+        return fixtures
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.NAMES:
+            with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(getattr(self, name), f, ensure_ascii=False, indent=1)
+
+
+def record(directory, stop_id="1", line_index=0):
+    """
+    Save one real response per endpoint as fixtures (uses token.txt).
+    """
+    from api_client import ApiClient, unwrap_lines
+
+    api = ApiClient()
+    fixtures = Fixtures()
+    fixtures.lines = unwrap_lines(api._get_json("/lines/"))
+    line_id = fixtures.lines[line_index]["id"]
+    fixtures.arrivals = api._get_json("/stops/{stop_id}/timestr", stop_id=stop_id)
+    fixtures.sublines = api.get_sublines(line_id)
+    fixtures.directions = api.get_directions_for_subline(fixtures.sublines[0]["subLineId"])
+    trip_id = fixtures.directions[0]["tripId"]
+    fixtures.stops = api.get_route_stops(line_id, trip_id)
+    fixtures.shape = api.get_route_shape(line_id, trip_id)
+    fixtures.save(directory)
+    api.close()
+
+
+# ----------------------------------------------------
+# Server
+# ----------------------------------------------------
+class FakeEmtHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests with the payload for the endpoint.
+    """
+
+    protocol_version = "HTTP/1.1"   # keep-alive like the real server
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    latency = 0.0                   # seconds added to every response
+    connect_delay = 0.0             # seconds added once per new connection
+    routes = []                     # see Fixtures.routes
+
+    def setup(self):
+        # Runs once per TCP connection: simulate TCP + TLS handshake cost
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path.startswith(PREFIX):
+            path = path[len(PREFIX):]
+
+        for pattern, body in self.routes:
+            if pattern.match(path):
+                break
+        else:
+            self._reply(404, json.dumps({"error": "not found"}).encode("utf-8"))
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        self._reply(200, body)
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEmtServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # concurrent clients open many sockets at once
+
+
+def start_server(latency=0.0, connect_delay=0.0, fixtures=None, port=0):
+    """
+    Start the fake server on localhost (a free port by default) in a
+    daemon thread. Returns (server, base_url); call server.shutdown()
+    when done.
+    """
+    fixtures = fixtures or Fixtures()
+    # Bodies are encoded once so the server's own JSON work stays out of the timings
+    routes = [(pattern, json.dumps(payload).encode("utf-8"))
+              for pattern, payload in fixtures.routes()]
+    handler = type("Handler", (FakeEmtHandler,), {
+        "latency": latency,
+        "connect_delay": connect_delay,
+        "routes": routes,
+    })
+    server = FakeEmtServer(("127.0.0.1", port), handler)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    return server, f"http://{host}:{port}{PREFIX}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local EMT API stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="seconds per new connection")
+    parser.add_argument("--fixtures", help="directory of recorded <endpoint>.json files")
+    parser.add_argument("--record", metavar="DIR", help="record real responses into DIR and exit")
+    parser.add_argument("--stop", default="1", help="stop recorded with --record")
+    parser.add_argument("--seed", type=int, default=0)
+    for name, default in (("lines", 3), ("arrivals", 2), ("sublines", 1),
+                          ("directions", 2), ("stops", 20), ("shape-points", 200)):
+        parser.add_argument(f"--{name}", type=int, default=default, help="generated entries")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, stop_id=args.stop)
+        print(f"Fixtures written to {args.record}")
+        return
+
+    sizes = dict(lines=args.lines, arrivals=args.arrivals, sublines=args.sublines,
+                 directions=args.directions, stops=args.stops,
+                 shape_points=args.shape_points, seed=args.seed)
+    fixtures = Fixtures.load(args.fixtures, **sizes) if args.fixtures else Fixtures(**sizes)
+
+    server, base = start_server(args.latency, args.connect_delay, fixtures, args.port)
+    print(f"Fake EMT API at {base} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
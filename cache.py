@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+class ResponseCache:
+    """
+    In-memory TTL + LRU cache for decoded API responses.
+    Each entry has its own expiry; when the total payload size
+    exceeds max_bytes the least recently used entries are evicted.
+    Thread-safe, so background workers can share it with the UI.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # key → (value, expires_at, size); order = recency of use
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ----------------------------------------------------
+    # Lookup / insert
+    # ----------------------------------------------------
+    def get(self, key):
+        """
+        Return the cached value, or MISSING if absent or expired.
+        Expired entries stay (until replaced or evicted) for get_stale().
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            value, expires_at, _ = entry
+            if expires_at <= self._clock():
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_stale(self, key, max_stale=None):
+        """
+        Return a value even if expired (at most max_stale seconds ago,
+        if given), or MISSING. Used when the network is unavailable.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+
+            value, expires_at, _ = entry
+            if max_stale is not None and expires_at + max_stale <= self._clock():
+                return MISSING
+            return value
+
+    def put(self, key, value, ttl, size=0):
+        """
+        Store a value for ttl seconds. size is the payload size in bytes
+        used for the memory cap (the raw response length is a good proxy).
+        """
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, self._clock() + ttl, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    # ----------------------------------------------------
+    # Invalidation
+    # ----------------------------------------------------
+    def invalidate(self, template=None):
+        """
+        Drop every entry, or only those of one endpoint template.
+        Keys are tuples whose first element is the template.
+        """
+        with self._lock:
+            if template is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+
+            for key in [k for k in self._entries if k[0] == template]:
+                self._remove(key)
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    # ----------------------------------------------------
+    # Stats
+    # ----------------------------------------------------
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,102 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+LineInfo = namedtuple("LineInfo", "code line_id name color")
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+@lru_cache(maxsize=1024)
+def normalize_code(code) -> str:
+    """
+    EMT uses:
+    - 'A1', 'A2' (letter + number)
+    - '3', '15', '30' (numbers)
+    Normalize codes so lookups match.
+    """
+    if not code:
+        return ""
+
+    code = str(code).strip()
+
+    # Airport and letter lines (A1, A2...)
+    if code[0].isalpha():
+        return code.upper()
+
+    # Pure numeric lines
+    digits = _NON_DIGITS.sub("", code)
+    return str(int(digits)) if digits else code
+
+
+def line_code(line):
+    return line.get("code") or line.get("shortName") or ""
+
+
+def line_id(line):
+    # Numeric ID used by EMT line endpoints
+    return line.get("id") or line.get("routeGtfsId")
+
+
+def line_color(line, default=None):
+    """
+    EMT provides either full hex (#123456) in "color"
+    or raw hex ("123456") in "routeColor".
+    """
+    raw_color = line.get("color")
+    if raw_color and raw_color.startswith("#"):
+        return raw_color
+
+    rc = line.get("routeColor")
+    return f"#{rc}" if rc else default
+
+
+class LineCatalog:
+    """
+    The EMT line list, fetched once from /lines/ and shared by
+    model (Tab 1 colors) and view (Tab 2 list).
+    Lookups by line code are O(1) on the normalized code.
+    """
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+
+        # normalized code → LineInfo (first line wins on duplicates)
+        self.by_code = {}
+        # API line id → LineInfo
+        self.by_id = {}
+        for line in self.lines:
+            code = line_code(line)
+            if not code:
+                continue
+            info = LineInfo(code, line_id(line), line.get("name", ""), line_color(line))
+            self.by_code.setdefault(normalize_code(code), info)
+            if info.line_id is not None:
+                self.by_id.setdefault(str(info.line_id), info)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def get(self, code):
+        """
+        LineInfo for a line code as printed anywhere ("03", "a1"…), or None.
+        """
+        return self.by_code.get(normalize_code(code))
+
+    def code_for_id(self, line_id):
+        """
+        Display code of the line with an API id, or None.
+        """
+        info = self.by_id.get(str(line_id))
+        return info.code if info else None
+
+    def color_for(self, code, default="#6b7280"):
+        """
+        Badge color for an arrival's line code.
+        Known lines without color data get a light grey.
+        """
+        info = self.get(code)
+        if info is None:
+            return default
+        return info.color or "#aaaaaa"
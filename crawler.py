@@ -0,0 +1,252 @@
+"""
+Walk the whole EMT network (lines → sublines → directions → stops + shape
+of every trip) into the local NetworkSnapshot, so network-wide features
+(stop index, maps) work without clicking through every line first.
+
+Run from the project root:
+    python crawler.py --workers 6 --rate 8
+Interrupted runs resume: responses already in the snapshot are skipped.
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from PyQt6.QtCore import QCoreApplication
+
+from api_client import ApiClient, CircuitOpenError, cache_key, unwrap_lines
+from catalog import line_id
+from resilience import TokenBucket, backoff_delay
+from snapshot import APP_NAME, NetworkSnapshot
+
+
+# HTTP statuses worth retrying: throttling and server-side trouble
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CrawlProgress:
+    """
+    Counters of a crawl, updated from the worker threads.
+    """
+
+    def __init__(self):
+        self.requests = 0     # HTTP attempts sent
+        self.resumed = 0      # responses already in the snapshot
+        self.retries = 0
+        self.failures = 0     # items given up on
+        self.trips = 0        # unique (line, trip) pairs found
+        self.duplicates = 0   # trips seen again under another subline
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def rate(self):
+        """
+        Requests per second since the crawl started.
+        """
+        elapsed = self.elapsed()
+        return self.requests / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.requests} requests ({self.rate():.1f} req/s), "
+                f"{self.resumed} resumed, {self.retries} retries, "
+                f"{self.failures} failed, {self.trips} trips "
+                f"({self.duplicates} duplicates) in {self.elapsed():.1f} s")
+
+
+class NetworkCrawler:
+    """
+    Fetches every static endpoint of the network through an ApiClient,
+    which stores each response in its NetworkSnapshot.
+
+    - at most `workers` requests in flight (bounded thread pool)
+    - at most `rate` requests per second (the client's token bucket)
+    - timeouts, connection errors, 429 and 5xx retried with backoff
+    - trips listed under several sublines are fetched once
+    - responses already in the snapshot are not requested again
+
+    The client's own limiter and retry settings are overridden only while
+    crawl() runs, and restored afterwards.
+    """
+
+    def __init__(self, api, workers=6, rate=8.0, max_retries=4,
+                 on_progress=None, report_every=2.0):
+        if api.snapshot is None:
+            raise ValueError("NetworkCrawler needs an ApiClient with a snapshot.")
+
+        self.api = api
+        self.workers = workers
+        self.rate = rate
+        self.max_retries = max_retries
+        self.on_progress = on_progress
+        self.report_every = report_every
+
+        self.progress = CrawlProgress()
+        self._lock = threading.Lock()
+        self._last_report = 0.0
+
+    def _report(self, force=False):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.report_every:
+                return
+            self._last_report = now
+        self.on_progress(self.progress)
+
+    # ----------------------------------------------------
+    # One endpoint, with resume, rate limit and retry
+    # ----------------------------------------------------
+    def _fetch(self, call, template, params=None, **path):
+        entry = self.api.snapshot.load(cache_key(template, params, path))
+        if entry is not None:
+            self.progress.add(resumed=1)
+            return entry.data
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.progress.add(requests=1)
+                return call()
+            except CircuitOpenError:
+                # Refused by the client's breaker: nothing was sent
+                self.progress.add(requests=-1)
+                if attempt == self.max_retries:
+                    raise
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUS or attempt == self.max_retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+
+            self.progress.add(retries=1)
+            time.sleep(backoff_delay(attempt))
+
+    def _lines(self):
+        data = self._fetch(self.api.get_lines_raw, "/lines/")
+        return [line_id(line) for line in unwrap_lines(data) if line_id(line) is not None]
+
+    def _sublines(self, lid):
+        data = self._fetch(lambda: self.api.get_sublines(lid),
+                           "/lines/{line_id}/sublines", line_id=lid)
+        return [(lid, s.get("subLineId")) for s in data if s.get("subLineId") is not None]
+
+    def _directions(self, item):
+        lid, subline_id = item
+        data = self._fetch(lambda: self.api.get_directions_for_subline(subline_id),
+                           "/lines/directions-subline", {"subLineId": subline_id})
+        return [(lid, d.get("tripId")) for d in data if d.get("tripId") is not None]
+
+    def _route_stops(self, trip):
+        lid, trip_id = trip
+        params = {"tripId": trip_id, **ApiClient.ROUTE_STOPS_PARAMS}
+        self._fetch(lambda: self.api.get_route_stops(lid, trip_id),
+                    "/lines/{line_id}/stops", params, line_id=lid)
+
+    def _route_shape(self, trip):
+        lid, trip_id = trip
+        self._fetch(lambda: self.api.get_route_shape(lid, trip_id),
+                    "/lines/{line_id}/shape", {"tripId": trip_id}, line_id=lid)
+
+    # ----------------------------------------------------
+    # Crawl
+    # ----------------------------------------------------
+    @contextmanager
+    def _client_settings(self):
+        """
+        The crawler owns pacing and retries: the client's limiter is
+        replaced by one at `rate`, waiting as long as needed, and the
+        client does not retry on its own, so every HTTP attempt goes
+        through (and is counted by) _fetch. The caller's settings are
+        put back on exit.
+        """
+        overrides = {"limiter": TokenBucket(self.rate), "THROTTLE_WAIT": None, "RETRIES": 0}
+        own = vars(self.api)
+        saved = {name: own[name] for name in overrides if name in own}
+
+        for name, value in overrides.items():
+            setattr(self.api, name, value)
+        try:
+            yield
+        finally:
+            for name in overrides:
+                if name in saved:
+                    setattr(self.api, name, saved[name])
+                else:
+                    delattr(self.api, name)   # back to the class default
+
+    def _run(self, pool, fn, items):
+        """
+        fn(item) for every item on the pool; returns the results of the
+        items that succeeded, in completion order.
+        """
+        futures = [pool.submit(fn, item) for item in items]
+        results = []
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except (requests.RequestException, ValueError):
+                self.progress.add(failures=1)
+            self._report()
+        return results
+
+    def crawl(self):
+        """
+        Walk the whole network. Returns the final CrawlProgress.
+        """
+        self.progress = CrawlProgress()
+
+        with self._client_settings(), \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl") as pool:
+            line_ids = self._lines()
+            sublines = [s for found in self._run(pool, self._sublines, line_ids) for s in found]
+            listed = [t for found in self._run(pool, self._directions, sublines) for t in found]
+
+            trips = list(dict.fromkeys(listed))
+            self.progress.add(trips=len(trips), duplicates=len(listed) - len(trips))
+
+            jobs = [(fn, trip) for trip in trips for fn in (self._route_stops, self._route_shape)]
+            self._run(pool, lambda job: job[0](job[1]), jobs)
+
+        self._report(force=True)
+        return self.progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=6, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=8.0, help="max requests per second")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--snapshot", default=None,
+                        help="SQLite snapshot to fill (default: the app's, see snapshot.default_path)")
+    parser.add_argument("--base", default=None, help="API base URL (default: EMT Palma)")
+    args = parser.parse_args()
+
+    # Same data directory as the app
+    QCoreApplication.setApplicationName(APP_NAME)
+    snapshot = NetworkSnapshot(args.snapshot)
+    api = ApiClient(base=args.base, pool_size=max(args.workers, 2), snapshot=snapshot)
+    crawler = NetworkCrawler(api, workers=args.workers, rate=args.rate,
+                             max_retries=args.retries,
+                             on_progress=lambda p: print(p, flush=True))
+    try:
+        crawler.crawl()
+    finally:
+        api.close()
+        snapshot.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QHeaderView, QFileDialog,
+)
+from PyQt6.QtCore import Qt, QTimer
+
+import tracing
+
+
+class DebugPanel(QWidget):
+    """
+    Hidden developer window (Ctrl+Shift+D in MainWindow): per-endpoint
+    latency percentiles from the tracer, API resilience counters, and
+    export of the metrics as JSON or Prometheus text.
+    """
+
+    COLUMNS = ("Endpoint", "Fase", "N", "p50 ms", "p95 ms", "p99 ms", "máx ms")
+
+    def __init__(self, model, tracer=None):
+        super().__init__()
+        self.model = model
+        self.tracer = tracer or tracing.tracer
+
+        self.setWindowTitle("Diagnóstico de la API")
+        self.resize(760, 480)
+
+        layout = QVBoxLayout(self)
+
+        self.summaryLabel = QLabel()
+        self.summaryLabel.setWordWrap(True)
+        layout.addWidget(self.summaryLabel)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        layout.addLayout(buttons)
+        for text, slot in (("Exportar JSON…", self._export_json),
+                           ("Exportar Prometheus…", self._export_prometheus),
+                           ("Reiniciar", self._reset)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+
+        # Refreshed only while visible
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    # ----------------------------------------------------
+    # Contents
+    # ----------------------------------------------------
+    def refresh(self):
+        rows = self.tracer.rows()
+        self.table.setRowCount(len(rows))
+        for r, (template, phase, s) in enumerate(rows):
+            values = (template, phase, str(s["count"]),
+                      *(f"{s[k] * 1000:.1f}" for k in ("p50", "p95", "p99", "max")))
+            for c, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if c >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(r, c, item)
+
+        self.summaryLabel.setText(self._summary())
+
+    def _summary(self):
+        api = self.model.api
+        stats = api.resilience_stats()
+        cache = api.cache.stats()
+
+        calls = {}
+        for (_, outcome), n in self.tracer.outcomes().items():
+            calls[outcome] = calls.get(outcome, 0) + n
+
+        return (
+            f"Circuito: {stats['breaker']['state']} · "
+            f"reintentos: {stats['retries']} · "
+            f"rechazadas: {stats['breaker']['rejected']} · "
+            f"datos antiguos servidos: {stats['served_stale']}\n"
+            f"Llamadas: {calls.get('network', 0)} red, {calls.get('cache', 0)} caché, "
+            f"{calls.get('error', 0)} error · "
+            f"caché en memoria: {cache['hits']} aciertos / {cache['misses']} fallos, "
+            f"{cache['bytes'] // 1024} KiB"
+        )
+
+    # ----------------------------------------------------
+    # Actions
+    # ----------------------------------------------------
+    def _save(self, title, default_name, file_filter, text):
+        path, _ = QFileDialog.getSaveFileName(self, title, default_name, file_filter)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def _export_json(self):
+        self._save("Exportar métricas", "emt_metrics.json", "JSON (*.json)",
+                   self.tracer.to_json())
+
+    def _export_prometheus(self):
+        self._save("Exportar métricas", "emt_metrics.prom", "Prometheus (*.prom *.txt)",
+                   self.tracer.to_prometheus())
+
+    def _reset(self):
+        self.tracer.reset()
+        self.refresh()
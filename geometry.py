@@ -0,0 +1,175 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # simplification falls back to pure Python
+    np = None
+
+
+EARTH_RADIUS = 6371008.8
+
+# Zoom levels a route shape is pre-simplified for (see MapHost)
+SHAPE_ZOOMS = (12, 14, 16)
+
+
+# ----------------------------------------------------
+# Douglas–Peucker simplification
+# ----------------------------------------------------
+def tolerance_for_zoom(zoom, lat=39.57, pixels=1.0):
+    """
+    Metres covered by `pixels` screen pixels at a Web Mercator zoom level.
+    """
+    return pixels * 156543.03392 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def _project(points):
+    """
+    Equirectangular projection to metres around the shape's first point.
+    Accurate enough for city-sized shapes.
+    """
+    lat0 = math.radians(points[0][0])
+    kx = EARTH_RADIUS * math.cos(lat0) * math.pi / 180
+    ky = EARTH_RADIUS * math.pi / 180
+    xs = [lon * kx for _, lon in points]
+    ys = [lat * ky for lat, _ in points]
+    return xs, ys
+
+
+def _keep_mask_numpy(xs, ys, tolerance):
+    x = np.asarray(xs)
+    y = np.asarray(ys)
+    keep = np.zeros(len(x), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(x) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        seg = math.hypot(dx, dy)
+        if seg == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(px * dy - py * dx) / seg
+
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = first + 1 + i
+            keep[mid] = True
+            stack.append((first, mid))
+            stack.append((mid, last))
+
+    return keep.tolist()
+
+
+def _keep_mask_python(xs, ys, tolerance):
+    keep = [False] * len(xs)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        dx, dy = xs[last] - xs[first], ys[last] - ys[first]
+        seg = math.hypot(dx, dy)
+
+        best, best_i = -1.0, first
+        for i in range(first + 1, last):
+            px, py = xs[i] - xs[first], ys[i] - ys[first]
+            d = abs(px * dy - py * dx) / seg if seg else math.hypot(px, py)
+            if d > best:
+                best, best_i = d, i
+
+        if best > tolerance:
+            keep[best_i] = True
+            stack.append((first, best_i))
+            stack.append((best_i, last))
+
+    return keep
+
+
+def simplify(points, tolerance):
+    """
+    Douglas–Peucker simplification of a (lat, lon) polyline.
+    tolerance is in metres; vectorized with NumPy when available.
+    """
+    points = list(points)
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    xs, ys = _project(points)
+    if np is not None:
+        keep = _keep_mask_numpy(xs, ys, tolerance)
+    else:
+        keep = _keep_mask_python(xs, ys, tolerance)
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_for_zooms(points, zooms=SHAPE_ZOOMS):
+    """
+    {zoom: simplified points}, each within about one pixel at that zoom.
+    """
+    points = list(points)
+    if not points:
+        return {z: [] for z in zooms}
+
+    lat = points[0][0]
+    return {z: simplify(points, tolerance_for_zoom(z, lat)) for z in zooms}
+
+
+# ----------------------------------------------------
+# Google encoded polyline
+# ----------------------------------------------------
+def encode_polyline(points, precision=5):
+    """
+    Encode (lat, lon) points with Google's polyline algorithm:
+    roughly 4–6 ASCII characters per point instead of two JSON floats.
+    """
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+
+    for lat, lon in points:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+
+    return "".join(out)
+
+
+def decode_polyline(encoded, precision=5):
+    """
+    Inverse of encode_polyline().
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+
+    return points
@@ -0,0 +1,138 @@
+from collections import namedtuple
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRectF, QSize
+from PyQt6.QtGui import QColor, QFont, QFontMetrics
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate
+
+
+# text: main label; badge/color: optional colored line code;
+# payload: UserRole data handed to click handlers (None = message row)
+Row = namedtuple("Row", "text badge color payload", defaults=(None, None, None))
+
+BadgeRole = Qt.ItemDataRole.UserRole + 1
+ColorRole = Qt.ItemDataRole.UserRole + 2
+
+
+class RowListModel(QAbstractListModel):
+    """
+    Flat list model for the Tab 2 columns.
+    Filling it is a single model reset, however many rows there are.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows([])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = self._rows[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.text
+        if role == Qt.ItemDataRole.UserRole:
+            return row.payload
+        if role == BadgeRole:
+            return row.badge
+        if role == ColorRole:
+            return row.color
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        if self._rows[index.row()].payload is None:
+            # Informative message ("No hay sublíneas…"), not clickable
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+
+class BadgeDelegate(QStyledItemDelegate):
+    """
+    Paints a row as: [colored code badge]  bold text.
+    Drawn directly with QPainter, no per-row widgets.
+    """
+
+    PADDING = 6
+    BADGE_PAD_X = 12
+    BADGE_PAD_Y = 6
+    BADGE_RADIUS = 6
+    GAP = 10
+
+    def _fonts(self, option):
+        bold = QFont(option.font)
+        bold.setWeight(QFont.Weight.Bold)
+        text = QFont(option.font)
+        text.setWeight(QFont.Weight.DemiBold)
+        return bold, text
+
+    def sizeHint(self, option, index):
+        bold, _ = self._fonts(option)
+        height = QFontMetrics(bold).height() + 2 * (self.BADGE_PAD_Y + self.PADDING)
+        return QSize(0, height)
+
+    def paint(self, painter, option, index):
+        # Selection / hover background from the current style
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget else None
+        if style:
+            style.drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+
+        bold, text_font = self._fonts(option)
+        rect = option.rect.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        x = rect.left()
+
+        badge = index.data(BadgeRole)
+        if badge:
+            fm = QFontMetrics(bold)
+            width = fm.horizontalAdvance(badge) + 2 * self.BADGE_PAD_X
+            badge_rect = QRectF(x, rect.top(), width, rect.height())
+
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(index.data(ColorRole) or "#999999"))
+            painter.drawRoundedRect(badge_rect, self.BADGE_RADIUS, self.BADGE_RADIUS)
+
+            painter.setFont(bold)
+            painter.setPen(QColor("white"))
+            painter.drawText(badge_rect, Qt.AlignmentFlag.AlignCenter, badge)
+            x += width + self.GAP
+            font = text_font
+        else:
+            font = bold
+
+        is_message = index.data(Qt.ItemDataRole.UserRole) is None
+        if is_message:
+            font = QFont(option.font)
+            font.setItalic(True)
+
+        if option.state & QStyle.StateFlag.State_Selected:
+            pen = option.palette.highlightedText().color()
+        else:
+            pen = option.palette.text().color()
+
+        text_rect = QRectF(x, rect.top(), rect.right() - x, rect.height())
+        text = QFontMetrics(font).elidedText(
+            index.data(Qt.ItemDataRole.DisplayRole) or "",
+            Qt.TextElideMode.ElideRight, int(text_rect.width()),
+        )
+
+        painter.setFont(font)
+        painter.setPen(pen)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, text)
+        painter.restore()
@@ -1,42 +1,68 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings
 
-from model import BusModel
-from view import MainWindow
+import startup
+startup.track_imports()
+
+with startup.step("import Qt"):
+    from PyQt6.QtCore import QCoreApplication, Qt
+    from PyQt6.QtWidgets import QApplication
+
+with startup.step("import model"):
+    from model import BusModel
+
+with startup.step("import view"):
+    from view import MainWindow
+
+with startup.step("import web_scheme"):
+    from web_scheme import register_scheme
+
+from snapshot import APP_NAME
+
+import profiling
 
 
 def main():
     """
     Entry point of the EMT Bus App.
+    - Registers the emt:// scheme used to serve maps from memory
     - Creates QApplication
-    - Enables required WebEngine settings so Leaflet maps load
     - Instantiates data model and main window
+
+    QtWebEngine (maps) is not loaded here: the map module is imported and
+    the WebEngine profile configured on first use, or warmed up in the
+    background once the window has painted (see MainWindow).
+    Set EMT_STARTUP_REPORT=1 for a startup timing report, and
+    EMT_PROFILE=1 (or pass --profile) for the GUI profiling mode.
     """
 
-    app = QApplication(sys.argv)
+    # Slots and model calls are instrumented before they are connected
+    profiler = profiling.setup(sys.argv)
 
-    # --------------------------------------------------------
-    # WebEngine: allow JS + allow local HTML to load Leaflet,
-    # CDN resources and injected JavaScript.
-    # Without these, the map stays white or fails silently.
-    # --------------------------------------------------------
-    profile = QWebEngineProfile.defaultProfile()
-    settings = profile.settings()
-    settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-    settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
-    settings.setAttribute(QWebEngineSettings.WebAttribute.AllowRunningInsecureContent, True)
+    # Custom schemes must be declared before the application exists,
+    # and shared GL contexts let QtWebEngineWidgets be imported later
+    register_scheme()
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    # Names the per-user data directory (network snapshot)
+    QCoreApplication.setApplicationName(APP_NAME)
+
+    with startup.step("QApplication"):
+        app = QApplication(sys.argv)
 
     # --------------------------------------------------------
     # Data layer (API client + formatting logic)
     # --------------------------------------------------------
-    model = BusModel()
+    with startup.step("BusModel"):
+        model = BusModel()
 
     # --------------------------------------------------------
     # GUI layer
     # --------------------------------------------------------
-    window = MainWindow(model)
+    with startup.step("MainWindow"):
+        window = MainWindow(model)
     window.show()
+    startup.after_first_paint(window, window.warm_up_map)
+    if profiler is not None:
+        profiler.start(window)
 
     # --------------------------------------------------------
     # Qt event loop
@@ -16,6 +16,7 @@ from PyQt6.QtWidgets import QApplication
 from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings
  
 from map_window import MapWindow
+from web_scheme import register_scheme
 
 
 def pause(msg="Press ENTER to continue..."):
@@ -71,15 +72,31 @@ def run_test_scenarios():
 
     win3 = MapWindow("TEST-LINE-CLUSTER", stops3)
     win3.show()
-    pause("\n[SCENARIO 3] Check cluster behavior. Press ENTER to finish.")
+    pause("\n[SCENARIO 3] Check cluster behavior. Press ENTER to continue.")
 
     win3.close()
 
+    # --------------------------------------------------------
+    # TEST SCENARIO 4 – Network-sized stop set (canvas + clustering)
+    # --------------------------------------------------------
+    print("Running Scenario 4: Dense stops test...")
+    stops4 = [
+        (str(4000+i), 39.52 + (i % 60) * 0.0015, 2.58 + (i // 60) * 0.0025, f"Dense Stop {i}")
+        for i in range(3000)
+    ]
+
+    win4 = MapWindow("TEST-NETWORK", stops4)
+    win4.show()
+    pause("\n[SCENARIO 4] Zoom and pan: clusters split smoothly, popups open. Press ENTER to finish.")
+
+    win4.close()
+
     print("\nAll scenarios completed successfully.")
     time.sleep(1)
 
 
 if __name__ == "__main__":
+    register_scheme()
     app = QApplication(sys.argv)
 
     # WebEngine permissions
@@ -0,0 +1,134 @@
+import json
+import os
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from web_scheme import scheme_handler
+from tile_cache import PREFETCH_ZOOMS
+from geometry import encode_polyline, simplify_for_zooms
+
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaflet_template.html")
+PAGE_PATH = "/host/map.html"
+
+
+class MapHostBridge(QObject):
+    """
+    Two-way bridge for the persistent map page.
+    Python → JS: routeChanged / shapeChanged carry JSON payloads.
+    JS → Python: ready() once the channel is up, clickStop(stop_id).
+    """
+
+    routeChanged = pyqtSignal(str)
+    shapeChanged = pyqtSignal(str)
+    stopSelected = pyqtSignal(str)
+    pageReady = pyqtSignal()
+
+    @pyqtSlot()
+    def ready(self):
+        self.pageReady.emit()
+
+    @pyqtSlot(str)
+    def clickStop(self, stop_id: str):
+        self.stopSelected.emit(stop_id)
+
+
+class MapHost(QWidget):
+    """
+    Reusable map window. The Leaflet page (leaflet_template.html) is
+    loaded once; each route is then pushed as a compact JSON message
+    that clears and refills the page's layers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.resize(700, 600)
+
+        # Last message per kind, replayed when the page becomes ready
+        self._ready = False
+        self._pending = {}
+
+        layout = QVBoxLayout(self)
+        self.web = QWebEngineView()
+        layout.addWidget(self.web)
+
+        self.bridge = MapHostBridge()
+        self.bridge.pageReady.connect(self._on_page_ready)
+        self.channel = QWebChannel(self.web.page())
+        self.channel.registerObject("bridge", self.bridge)
+        self.web.page().setWebChannel(self.channel)
+
+        with open(TEMPLATE_PATH, "rb") as f:
+            url = scheme_handler().add(PAGE_PATH, f.read())
+        self.web.load(url)
+
+    # ----------------------------------------------------
+    # Route updates
+    # ----------------------------------------------------
+    def show_route(self, line_name: str, stops, shape_points=None):
+        """
+        :param stops: list of (stop_id, lat, lon, name)
+        :param shape_points: optional list of (lat, lon)
+        """
+        self.setWindowTitle(f"Mapa de línea {line_name}")
+
+        payload = {
+            "stops": [
+                {"id": str(stop_id), "lat": lat, "lon": lon, "name": name}
+                for stop_id, lat, lon, name in stops
+            ],
+            "shape": self._encode_shape(shape_points or []),
+        }
+
+        # A new route replaces anything still waiting for the page
+        self._pending.clear()
+        self._send(self.bridge.routeChanged, payload)
+
+        self._prefetch_tiles(stops)
+
+    def _prefetch_tiles(self, stops):
+        """
+        Warm the tile cache for the route's bounding box so panning and
+        zooming around it work offline next time (only for tile sources
+        that allow prefetching; see TileCache).
+        """
+        tiles = scheme_handler().tiles
+        if tiles is None or not stops:
+            return
+
+        lats = [s[1] for s in stops]
+        lons = [s[2] for s in stops]
+        tiles.prefetch(min(lats), min(lons), max(lats), max(lons), PREFETCH_ZOOMS)
+
+    def set_shape(self, shape_points):
+        """
+        Draw the polyline of the current route (arrives after the stops).
+        """
+        self._send(self.bridge.shapeChanged, self._encode_shape(shape_points))
+
+    @staticmethod
+    def _encode_shape(shape_points):
+        """
+        {zoom: encoded polyline}: one simplified copy per zoom band, so the
+        page never draws more vertices than it can show.
+        """
+        if not shape_points:
+            return {}
+        levels = simplify_for_zooms(shape_points)
+        return {str(z): encode_polyline(points) for z, points in levels.items()}
+
+    def _send(self, signal, payload):
+        message = json.dumps(payload, separators=(",", ":"))
+        if self._ready:
+            signal.emit(message)
+        else:
+            self._pending[signal.signal] = (signal, message)
+
+    def _on_page_ready(self):
+        self._ready = True
+        for signal, message in self._pending.values():
+            signal.emit(message)
+        self._pending.clear()
@@ -1,11 +1,40 @@
-import os
+import itertools
+import json
 import statistics
 import folium
 
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebChannel import QWebChannel
-from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot, QUrl
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from web_scheme import scheme_handler
+from tile_cache import ATTRIBUTION
+from geometry import SHAPE_ZOOMS, simplify, tolerance_for_zoom
+
+# Each window gets its own in-memory page (emt://app/maps/<n>.html)
+_page_ids = itertools.count(1)
+
+# Bundled Leaflet, served by web_scheme from assets/
+LEAFLET_JS = [("leaflet", "/assets/leaflet/leaflet.js")]
+LEAFLET_CSS = [("leaflet_css", "/assets/leaflet/leaflet.css")]
+STOP_LAYER_JS = ("stop_layer", "/assets/stop_layer.js")
+TILES_URL = "/tiles/{z}/{x}/{y}.png"
+
+# From this many stops the map switches to canvas markers + clustering
+DENSE_STOPS = 150
+
+
+def _compact_shape(shape_points):
+    """
+    Shape simplified to the most detailed map zoom and rounded to ~1 m,
+    so folium does not serialize thousands of long floats into the page.
+    """
+    points = list(shape_points)
+    if not points:
+        return []
+    tolerance = tolerance_for_zoom(SHAPE_ZOOMS[-1], points[0][0])
+    return [[round(lat, 5), round(lon, 5)] for lat, lon in simplify(points, tolerance)]
 
 
 class MapBridge(QObject):
@@ -28,13 +57,17 @@ class MapWindow(QWidget):
     Shows:
     - Route polyline (shape)
     - Stop markers (with popup buttons that notify Python)
+
+    Dense mode draws stops as clustered canvas circles (assets/stop_layer.js)
+    instead of one folium.Marker each; used for long stop lists.
     """
 
-    def __init__(self, line_name: str, stops, shape_points=None):
+    def __init__(self, line_name: str, stops, shape_points=None, dense=None):
         """
         :param line_name: Visible line code ("3", "A1", etc.)
         :param stops: list of (stop_id, lat, lon, name)
         :param shape_points: optional list of (lat, lon) for route polyline
+        :param dense: force dense mode on/off (default: by stop count)
         """
         super().__init__()
 
@@ -42,15 +75,21 @@ class MapWindow(QWidget):
         self.resize(700, 600)
 
         self.shape_points = shape_points or []
+        self.dense = len(stops) >= DENSE_STOPS if dense is None else dense
+
+        # JS queued until the page has finished loading
+        self._loaded = False
+        self._pending_js = []
 
         layout = QVBoxLayout(self)
 
         # Web view that will host the folium HTML
         self.web = QWebEngineView()
+        self.web.loadFinished.connect(self._on_load_finished)
         layout.addWidget(self.web)
 
-        # Build initial map and save HTML
-        self.html_path = self._build_folium_map(line_name, stops, self.shape_points)
+        # Build initial map as an HTML string (never written to disk)
+        html = self._build_folium_map(line_name, stops, self.shape_points)
 
         # Setup channel and bridge for JS <-> Python
         self.channel = QWebChannel(self.web.page())
@@ -58,12 +97,17 @@ class MapWindow(QWidget):
         self.channel.registerObject("bridge", self.bridge)
         self.web.page().setWebChannel(self.channel)
 
-        # Inject JS bridge into the HTML
-        self._inject_bridge_js()
+        # Inject JS bridge into the HTML and serve it from memory
+        html = self._inject_bridge_js(html)
 
-        url = QUrl.fromLocalFile(os.path.abspath(self.html_path))
+        self.page_path = f"/maps/{next(_page_ids)}.html"
+        url = scheme_handler().add(self.page_path, html.encode("utf-8"))
         self.web.load(url)
 
+    def closeEvent(self, event):
+        scheme_handler().remove(self.page_path)
+        super().closeEvent(event)
+
     # ----------------------------------------------------
     # Create the folium map with markers + optional polyline
     # ----------------------------------------------------
@@ -79,12 +123,25 @@ class MapWindow(QWidget):
         else:
             center = [39.57, 2.65]  # fallback center (Palma)
 
-        m = folium.Map(location=center, zoom_start=13)
+        # Tiles served by the app's local tile cache (see tile_cache.py)
+        m = folium.Map(
+            location=center, zoom_start=13, tiles=TILES_URL, attr=ATTRIBUTION,
+            prefer_canvas=self.dense,
+        )
+        self.map_name = m.get_name()
+
+        # Only Leaflet is needed; use the bundled copy instead of folium's
+        # CDN set (jQuery, Bootstrap, awesome-markers, Font Awesome…)
+        m.default_js = LEAFLET_JS + ([STOP_LAYER_JS] if self.dense else [])
+        m.default_css = LEAFLET_CSS
 
         # Draw route polyline if we have shape points
         if shape_points:
-            coords = [[lat, lon] for (lat, lon) in shape_points]
-            folium.PolyLine(coords, weight=4, color="blue", opacity=0.8).add_to(m)
+            folium.PolyLine(_compact_shape(shape_points), weight=4, color="blue", opacity=0.8).add_to(m)
+
+        if self.dense:
+            self._add_stop_layer(m, stops)
+            return m.get_root().render()
 
         # Add markers for each stop
         for stop_id, lat, lon, name in stops:
@@ -98,24 +155,68 @@ class MapWindow(QWidget):
                 [lat, lon],
                 popup=popup_html,
                 tooltip=f"{stop_id} - {name}",
-                icon=folium.Icon(color="red")
             ).add_to(m)
 
-        html_path = os.path.join(os.path.dirname(__file__), "map_line.html")
-        m.save(html_path)
-        return html_path
+        return m.get_root().render()
+
+    def _add_stop_layer(self, m, stops):
+        """
+        Hand the stops to StopLayer as one JSON array; it draws them on a
+        canvas and builds popups only when opened.
+        """
+        data = json.dumps(
+            [{"id": str(stop_id), "lat": lat, "lon": lon, "name": name}
+             for stop_id, lat, lon, name in stops],
+            separators=(",", ":"),
+        ).replace("</", "<\\/")
+
+        # Folium's map script comes after ours in the page; wait for it
+        m.get_root().script.add_child(folium.Element(
+            "document.addEventListener('DOMContentLoaded', function() {"
+            f" new StopLayer({self.map_name}, {{onSelect: sendStopToPython}}).setStops({data});"
+            " });"
+        ))
+
+    # ----------------------------------------------------
+    # Late route shape (arrives after the stops)
+    # ----------------------------------------------------
+    def set_shape(self, shape_points):
+        """
+        Draw the route polyline on an already open map.
+        Used when the shape request finishes after the window opened.
+        """
+        if not shape_points or self.shape_points:
+            return
+
+        self.shape_points = shape_points
+        coords = json.dumps(_compact_shape(shape_points), separators=(",", ":"))
+        self._run_js(
+            f"L.polyline({coords}, {{weight: 4, color: 'blue', opacity: 0.8}})"
+            f".addTo({self.map_name});"
+        )
+
+    def _run_js(self, script):
+        if self._loaded:
+            self.web.page().runJavaScript(script)
+        else:
+            self._pending_js.append(script)
+
+    def _on_load_finished(self, ok):
+        self._loaded = ok
+        if not ok:
+            return
+        for script in self._pending_js:
+            self.web.page().runJavaScript(script)
+        self._pending_js.clear()
 
     # ----------------------------------------------------
     # Inject QtWebChannel JS + bridge into folium HTML
     # ----------------------------------------------------
-    def _inject_bridge_js(self):
+    def _inject_bridge_js(self, html):
         """
         Attach JS code so the map can talk back to Python
         using the Qt WebChannel API.
         """
-        with open(self.html_path, "r", encoding="utf-8") as f:
-            html = f.read()
-
         injection = """
 <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
 <script>
@@ -134,9 +235,5 @@ class MapWindow(QWidget):
 """
 
         if "</body>" in html:
-            html = html.replace("</body>", injection)
-        else:
-            html += injection
-
-        with open(self.html_path, "w", encoding="utf-8") as f:
-            f.write(html)
+            return html.replace("</body>", injection)
+        return html + injection
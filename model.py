@@ -1,6 +1,47 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from api_client import ApiClient
-import re
+from api_client import ApiClient, eta_minutes
+from snapshot import NetworkSnapshot
+from catalog import LineCatalog, normalize_code
+from stop_index import StopIndex
+from tracing import tracer
+
+
+# Endpoint templates, also the tags of the formatting timings
+ARRIVALS_TEMPLATE = "/stops/{stop_id}/timestr"
+ROUTE_STOPS_TEMPLATE = "/lines/{line_id}/stops"
+ROUTE_SHAPE_TEMPLATE = "/lines/{line_id}/shape"
+
+# Stops fetched in parallel by fetch_arrivals_many (one pooled connection each)
+ARRIVAL_WORKERS = 20
+
+# One bus on its way to a stop; seconds as reported by the API
+Arrival = namedtuple("Arrival", "stop line destination seconds color")
+
+
+def parse_route_stops(raw_stops):
+    """
+    [(stop_code, lat, lon, name)] from a raw /lines/{id}/stops response,
+    skipping stops without valid coordinates.
+    """
+    stops = []
+
+    for s in raw_stops:
+        stop_code = s.get("stopCode") or s.get("stopGtfsId") or str(s.get("id"))
+        name = s.get("stopName") or s.get("stopDesc") or stop_code
+
+        try:
+            lat = float(s.get("stopLat"))
+            lon = float(s.get("stopLon"))
+        except (TypeError, ValueError):
+            # Skip any stop without valid coordinates
+            continue
+
+        stops.append((stop_code, lat, lon, name))
+
+    return stops
 
 
 class BusModel:
@@ -9,38 +50,82 @@ class BusModel:
     Handles formatting, lookups and EMT-specific normalization.
     """
 
-    def __init__(self):
-        self.api = ApiClient()
+    def __init__(self, snapshot_path=None):
+        # Static network data is served from the on-disk snapshot at boot
+        # and revalidated in the background (see snapshot.default_path)
+        self.api = ApiClient(pool_size=ARRIVAL_WORKERS, snapshot=NetworkSnapshot(snapshot_path))
         self.last_stop = None
 
-        # Load line colors for Tab 1
+        # Background requests. Arrivals in flight are shared by every
+        # caller asking for the same stop meanwhile (Tab 1, auto-refresh, boards)
+        self._pool = ThreadPoolExecutor(max_workers=ARRIVAL_WORKERS,
+                                        thread_name_prefix="model")
+        self._inflight = {}   # stop_id → Future of [(line, dest, seconds)]
+        self._inflight_lock = threading.RLock()
+
+        # One /lines/ download feeds Tab 1 colors and the Tab 2 list.
+        # It starts right away but never blocks construction: the catalog
+        # stays empty until the shared future lands (see load_catalog).
+        self.catalog_error = None
+        self.catalog = LineCatalog([])
+        self._catalog_future = None
+        self.load_catalog()
+
+        # Every stop seen on any route: search box and nearby-stop queries
+        self.stop_index = StopIndex()
+
+    def load_catalog(self):
+        """
+        Future of the LineCatalog. Every caller shares the same /lines/
+        request; a failed load is retried on the next call.
+        """
+        with self._inflight_lock:
+            future = self._catalog_future
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._catalog_future = self._pool.submit(self._fetch_catalog)
+            return future
+
+    def _fetch_catalog(self):
+        try:
+            catalog = LineCatalog(self.api.get_lines_raw())
+        except Exception as e:
+            self.catalog_error = e
+            raise
+        self.catalog_error = None
+        self.catalog = catalog
+        return catalog
+
+    def wait_catalog(self, timeout=None):
+        """
+        Block until the catalog has loaded (for worker threads).
+        """
+        return self.load_catalog().result(timeout)
+
+    def reload_catalog(self):
+        """
+        Rebuild the catalog if the API now serves a different line list
+        (e.g. after background revalidation). Returns True if it changed.
+        """
         try:
-            self.colors = self.api.get_lines()
+            lines = self.api.get_lines_raw()
         except Exception:
-            self.colors = {}
+            return False
+
+        if self.catalog.lines and lines == self.catalog.lines:
+            return False
+
+        self.catalog_error = None
+        self.catalog = LineCatalog(lines)
+        return True
 
     # ----------------------------------------------------
     # Normalization helpers
     # ----------------------------------------------------
     def _normalize(self, code: str) -> str:
         """
-        EMT uses:
-        - 'A1', 'A2' (letter + number)
-        - '3', '15', '30' (numbers)
-        Normalize codes so lookups match.
+        Normalize a line code ('03' → '3', 'a1' → 'A1') so lookups match.
         """
-        if not code:
-            return ""
-
-        code = str(code).strip()
-
-        # Airport and letter lines (A1, A2...)
-        if code[0].isalpha():
-            return code.upper()
-
-        # Pure numeric lines
-        digits = re.sub(r"\D", "", code)
-        return str(int(digits)) if digits else code
+        return normalize_code(code)
 
     # ----------------------------------------------------
     # TAB 1 — Arrivals per stop
@@ -50,34 +135,116 @@ class BusModel:
         Fetch arrivals, attach line colors and format result
         for the UI in Tab 1.
         """
-        arrivals = self.api.get_arrivals(stop_id)
+        arrivals = self._arrival_times(stop_id).result()
         if not arrivals:
             raise LookupError("No arrivals for this stop.")
 
         formatted = []
 
-        for line, dest, eta in arrivals:
-            norm = self._normalize(line)
-            color = "#6b7280"  # default grey
+        with tracer.phase("format", ARRIVALS_TEMPLATE):
+            for line, dest, seconds in arrivals:
+                eta = eta_minutes(seconds)
+                formatted.append({
+                    "line": line,
+                    "destination": dest,
+                    "eta": f"{eta} min",
+                    "minutes": eta,
+                    "color": self.catalog.color_for(line)
+                })
 
-            # Match line color from EMT line list
-            for key, value in self.colors.items():
-                if self._normalize(key) == norm:
-                    color = value if value.startswith("#") else f"#{value}"
-                    break
+        return {
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "data": formatted
+        }
 
-            formatted.append({
-                "line": line,
-                "destination": dest,
-                "eta": f"{eta} min",
-                "color": color
-            })
+    def fetch_arrivals_many(self, stop_ids, timeout=None):
+        """
+        Arrivals of several stops, fetched concurrently, as numeric records
+        merged across stops, soonest first:
+        {
+            "timestamp": "HH:MM:SS",
+            "arrivals": [Arrival(stop, line, destination, seconds, color), ...],
+            "errors": {stop_id: exception}
+        }
+        A stop that fails does not fail the others.
+        """
+        stops = list(dict.fromkeys(str(s).strip() for s in stop_ids))
+        futures = {stop: self._arrival_times(stop) for stop in stops}
 
+        results = {}
+        errors = {}
+        for stop, future in futures.items():
+            try:
+                results[stop] = future.result(timeout)
+            except Exception as e:
+                errors[stop] = e
+
+        arrivals = []
+        with tracer.phase("format", ARRIVALS_TEMPLATE):
+            for stop, times in results.items():
+                for line, dest, seconds in times:
+                    arrivals.append(Arrival(stop, line, dest, seconds, self.catalog.color_for(line)))
+            arrivals.sort(key=lambda a: (a.seconds, a.stop, a.line))
         return {
             "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "data": formatted
+            "arrivals": arrivals,
+            "errors": errors,
         }
 
+    def _arrival_times(self, stop_id):
+        """
+        Future of a stop's (line, destination, seconds) list. Callers asking
+        for a stop that is already being fetched share that request.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(stop_id)
+            if future is None:
+                future = self._pool.submit(self.api.get_arrival_times, stop_id)
+                self._inflight[stop_id] = future
+                future.add_done_callback(lambda f: self._forget_inflight(stop_id, f))
+            return future
+
+    def _forget_inflight(self, stop_id, future):
+        with self._inflight_lock:
+            if self._inflight.get(stop_id) is future:
+                del self._inflight[stop_id]
+
+    # ----------------------------------------------------
+    # TAB 1 — Stop search
+    # ----------------------------------------------------
+    def load_stop_index(self):
+        """
+        Fill the stop index from every route stored in the network snapshot
+        (disk only, no requests). Returns the number of stops known.
+        """
+        snapshot = self.api.snapshot
+        if snapshot is None:
+            return len(self.stop_index)
+
+        # Serving lines are named by code: wait for the shared /lines/ load
+        try:
+            self.wait_catalog()
+        except Exception:
+            pass
+
+        for path, _params, data in snapshot.entries(ROUTE_STOPS_TEMPLATE):
+            line = self.catalog.code_for_id(path.get("line_id"))
+            self.stop_index.add_route(parse_route_stops(data), line)
+
+        return len(self.stop_index)
+
+    def search_stops(self, text, limit=10):
+        """
+        StopRecords whose code or name matches the search box text.
+        """
+        return self.stop_index.search(text, limit)
+
+    def nearest_stops(self, lat, lon, k=5, max_radius=1000):
+        """
+        [(distance_m, StopRecord)] for the k stops closest to a point.
+        """
+        return self.stop_index.nearest(lat, lon, k, max_radius)
+
     # ----------------------------------------------------
     # TAB 2 — Sublines (first click)
     # ----------------------------------------------------
@@ -108,21 +275,9 @@ class BusModel:
         ]
         """
         raw_stops = self.api.get_route_stops(line_id, trip_id)
-        stops = []
-
-        for s in raw_stops:
-            stop_code = s.get("stopCode") or s.get("stopGtfsId") or str(s.get("id"))
-            name = s.get("stopName") or s.get("stopDesc") or stop_code
-
-            try:
-                lat = float(s.get("stopLat"))
-                lon = float(s.get("stopLon"))
-            except (TypeError, ValueError):
-                # Skip any stop without valid coordinates
-                continue
-
-            stops.append((stop_code, lat, lon, name))
-
+        with tracer.phase("format", ROUTE_STOPS_TEMPLATE):
+            stops = parse_route_stops(raw_stops)
+        self.stop_index.add_route(stops, self.catalog.code_for_id(line_id))
         return stops
 
     # ----------------------------------------------------
@@ -135,12 +290,13 @@ class BusModel:
         raw_shape = self.api.get_route_shape(line_id, trip_id)
         coords = []
 
-        for p in raw_shape:
-            try:
-                lat = float(p.get("latitude"))
-                lon = float(p.get("longitude"))
-            except (TypeError, ValueError):
-                continue
-            coords.append((lat, lon))
+        with tracer.phase("format", ROUTE_SHAPE_TEMPLATE):
+            for p in raw_shape:
+                try:
+                    lat = float(p.get("latitude"))
+                    lon = float(p.get("longitude"))
+                except (TypeError, ValueError):
+                    continue
+                coords.append((lat, lon))
 
         return coords
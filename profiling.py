@@ -0,0 +1,314 @@
+import cProfile
+import functools
+import importlib.abc
+import importlib.util
+import inspect
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QKeySequence, QShortcut
+from PyQt6.QtWidgets import QApplication
+
+from tracing import Histogram
+
+
+# Set EMT_PROFILE=1 (or run main.py --profile) to enable
+ENABLED = os.environ.get("EMT_PROFILE") == "1"
+
+# Event-loop stalls longer than this are sampled and reported
+STALL_MS = int(os.environ.get("EMT_PROFILE_STALL_MS", "100"))
+
+# Where the report, folded stacks and cProfile dumps are written
+OUTPUT_DIR = os.environ.get("EMT_PROFILE_DIR", ".")
+
+HEARTBEAT_MS = 16   # one frame at 60 Hz
+SAMPLE_MS = 5       # stack sampling period during a stall
+MAX_DEPTH = 64
+
+# Methods timed in profiling mode: (module, class, methods).
+# Modules not imported yet (the QtWebEngine ones) are instrumented on import.
+TARGETS = (
+    ("view", "MainWindow", (
+        "check_stop", "show_arrivals", "_on_arrivals_loaded", "_on_catalog_loaded",
+        "_populate_lines", "_populate_sublines", "_populate_directions",
+        "_on_line_clicked", "_on_direction_clicked", "_open_map", "_ensure_map_host",
+    )),
+    ("model", "BusModel", (
+        "fetch_arrivals", "fetch_arrivals_many", "get_sublines", "get_directions",
+        "get_route_stops", "get_route_shape", "search_stops", "nearest_stops",
+        "load_stop_index",
+    )),
+    ("map_host", "MapHost", ("__init__", "show_route", "set_shape")),
+    ("map_window", "MapWindow", ("__init__", "_build_folium_map", "set_shape")),
+)
+
+
+# ----------------------------------------------------
+# Profiler
+# ----------------------------------------------------
+class GuiProfiler:
+    """
+    Profiling mode for the GUI:
+    - timers around slots and model calls (TARGETS), split by thread
+    - frame-time tracking: a heartbeat timer on the event loop
+    - stall detection: a watchdog thread samples the GUI thread's stack
+      while the heartbeat is late by more than STALL_MS
+    - cProfile of the GUI thread on demand (Ctrl+Shift+P toggles)
+    On quit, a text report and a folded-stacks file (flamegraph.pl,
+    speedscope) are written to OUTPUT_DIR.
+    """
+
+    def __init__(self, stall_ms=STALL_MS, output_dir=OUTPUT_DIR):
+        self.stall = stall_ms / 1000
+        self.output_dir = output_dir
+        self.prefix = os.path.join(output_dir, f"emt-profile-{os.getpid()}")
+
+        self._lock = threading.Lock()
+        self.calls = {}              # "Class.method" → Histogram
+        self.gui_calls = Counter()   # "Class.method" → calls made on the GUI thread
+        self.frames = Histogram()    # time between heartbeats
+        self.stalls = []             # (started at, seconds, hottest leaf frame)
+        self.stacks = Counter()      # folded stack → samples, all stalls
+        self._stall_stacks = Counter()
+
+        self._gui_thread = threading.main_thread().ident
+        self._t0 = time.perf_counter()
+        self._beat = self._t0
+        self._stop = threading.Event()
+        self._cprofile = None
+        self._dumps = []
+
+    # ------------------------------------------------
+    # Call timers
+    # ------------------------------------------------
+    def timed(self, name, fn):
+        """
+        Wrap fn so each call is recorded under name. Extra positional
+        arguments are dropped like PyQt does for plain slots (clicked
+        passes `checked` to check_stop(self)).
+        """
+        params = inspect.signature(fn).parameters.values()
+        if any(p.kind is p.VAR_POSITIONAL for p in params):
+            arity = None
+        else:
+            arity = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args[:arity], **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def record(self, name, seconds):
+        on_gui = threading.get_ident() == self._gui_thread
+        with self._lock:
+            hist = self.calls.get(name)
+            if hist is None:
+                hist = self.calls[name] = Histogram()
+            hist.record(seconds)
+            if on_gui:
+                self.gui_calls[name] += 1
+
+    def instrument(self, cls, methods):
+        for method in methods:
+            setattr(cls, method, self.timed(f"{cls.__name__}.{method}", getattr(cls, method)))
+
+    def instrument_targets(self, targets=TARGETS):
+        """
+        Instrument classes before they are instantiated (signal
+        connections bind the methods). Modules not imported yet are
+        instrumented when they are, so profiling does not pull
+        QtWebEngine in early.
+        """
+        for module_name, class_name, methods in targets:
+            module = sys.modules.get(module_name)
+            if module is not None:
+                self.instrument(getattr(module, class_name), methods)
+            else:
+                sys.meta_path.insert(0, _InstrumentOnImport(self, module_name, class_name, methods))
+
+    # ------------------------------------------------
+    # Event loop
+    # ------------------------------------------------
+    def start(self, window):
+        """
+        Start frame tracking and the watchdog; call once the main
+        window exists.
+        """
+        self._beat = time.perf_counter()
+        self.heartbeat = QTimer(window)
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self._on_beat)
+        self.heartbeat.start()
+
+        threading.Thread(target=self._watch, name="profiling-watchdog", daemon=True).start()
+
+        QShortcut(QKeySequence("Ctrl+Shift+P"), window, activated=self.toggle_cprofile)
+        QApplication.instance().aboutToQuit.connect(self.stop)
+
+    def _on_beat(self):
+        now = time.perf_counter()
+        interval = now - self._beat
+        self._beat = now
+        self.frames.record(interval)
+
+        if interval > self.stall:
+            with self._lock:
+                hottest = self._stall_stacks.most_common(1)
+                leaf = hottest[0][0].rsplit(";", 1)[-1] if hottest else "?"
+                self.stalls.append((now - interval - self._t0, interval, leaf))
+                self._stall_stacks.clear()
+
+    def _watch(self):
+        while not self._stop.wait(SAMPLE_MS / 1000):
+            if time.perf_counter() - self._beat < self.stall:
+                continue
+            frame = sys._current_frames().get(self._gui_thread)
+            if frame is None:
+                continue
+            stack = _folded(frame)
+            with self._lock:
+                self.stacks[stack] += 1
+                self._stall_stacks[stack] += 1
+
+    # ------------------------------------------------
+    # cProfile on demand
+    # ------------------------------------------------
+    def toggle_cprofile(self):
+        """
+        Start profiling the GUI thread, or stop and dump a .pstats file
+        (open with snakeviz or `python -m pstats`).
+        """
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+            print("profiling: cProfile started (Ctrl+Shift+P to stop)", file=sys.stderr)
+            return
+
+        self._cprofile.disable()
+        path = f"{self.prefix}-{len(self._dumps) + 1}.pstats"
+        self._cprofile.dump_stats(path)
+        self._dumps.append((path, self._cprofile))
+        self._cprofile = None
+        print(f"profiling: cProfile written to {path}", file=sys.stderr)
+
+    # ------------------------------------------------
+    # Report
+    # ------------------------------------------------
+    def stop(self):
+        self._stop.set()
+        if self._cprofile is not None:
+            self.toggle_cprofile()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(f"{self.prefix}.folded", "w", encoding="utf-8") as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+        text = self.report()
+        with open(f"{self.prefix}.txt", "w", encoding="utf-8") as f:
+            f.write(text)
+        print(text, file=sys.stderr)
+        print(f"profiling: report and folded stacks in {self.prefix}.*", file=sys.stderr)
+
+    def report(self, top=10):
+        out = io.StringIO()
+        with self._lock:
+            calls = sorted(((name, h.summary()) for name, h in self.calls.items()),
+                           key=lambda item: item[1]["sum"], reverse=True)
+            gui_calls = dict(self.gui_calls)
+            stalls = sorted(self.stalls, key=lambda s: s[1], reverse=True)
+            frames = self.frames.summary()
+
+        out.write(f"\nProfile ({time.perf_counter() - self._t0:.1f} s)\n")
+        out.write(f"\n{'Calls (ms)':<40}{'n':>6}{'gui':>6}{'p50':>9}{'p95':>9}{'max':>9}{'total':>10}\n")
+        for name, s in calls:
+            out.write(f"  {name:<38}{s['count']:>6}{gui_calls.get(name, 0):>6}"
+                      f"{s['p50'] * 1000:>9.1f}{s['p95'] * 1000:>9.1f}"
+                      f"{s['max'] * 1000:>9.1f}{s['sum'] * 1000:>10.1f}\n")
+
+        out.write(f"\nFrame time (ms, heartbeat every {HEARTBEAT_MS} ms): "
+                  f"p50 {frames['p50'] * 1000:.1f} · p95 {frames['p95'] * 1000:.1f} · "
+                  f"p99 {frames['p99'] * 1000:.1f} · max {frames['max'] * 1000:.1f}\n")
+        out.write(f"Stalls over {self.stall * 1000:.0f} ms: {len(stalls)}, "
+                  f"{sum(s[1] for s in stalls) * 1000:.0f} ms blocked\n")
+        for started, seconds, leaf in stalls[:top]:
+            out.write(f"  {seconds * 1000:8.1f} ms at {started:7.2f} s  {leaf}\n")
+
+        for path, profile in self._dumps:
+            out.write(f"\ncProfile {path} (top {top} by cumulative time)\n")
+            stats = pstats.Stats(profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+
+def _folded(frame):
+    """
+    "file:function;file:function;…" from the outermost frame to frame.
+    """
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _InstrumentOnImport(importlib.abc.MetaPathFinder):
+    """
+    Instruments a class right after its module is first executed.
+    """
+
+    def __init__(self, profiler, module_name, class_name, methods):
+        self.profiler = profiler
+        self.module_name = module_name
+        self.class_name = class_name
+        self.methods = methods
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.module_name:
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_and_instrument(module):
+            exec_module(module)
+            self.profiler.instrument(getattr(module, self.class_name), self.methods)
+
+        spec.loader.exec_module = exec_and_instrument
+        return spec
+
+
+# ----------------------------------------------------
+# Entry point
+# ----------------------------------------------------
+def setup(argv):
+    """
+    Enable profiling if EMT_PROFILE=1 or --profile is in argv (removed
+    so Qt does not see it). Returns the GuiProfiler, or None.
+    Call before the main window and model are created.
+    """
+    enabled = ENABLED
+    if "--profile" in argv:
+        argv.remove("--profile")
+        enabled = True
+    if not enabled:
+        return None
+
+    profiler = GuiProfiler()
+    profiler.instrument_targets()
+    return profiler
@@ -0,0 +1,191 @@
+import random
+import threading
+import time
+
+
+# ----------------------------------------------------
+# Rate limiting
+# ----------------------------------------------------
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts of up to
+    `capacity`. Each request takes one token.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if available right now; never waits.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Wait until tokens are available. Returns False if that would
+        take longer than timeout seconds.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+# ----------------------------------------------------
+# Retry
+# ----------------------------------------------------
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Seconds to wait before retry number `attempt` (0-based):
+    exponential with full jitter, so clients do not retry in lockstep.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# ----------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is down.
+
+    closed     requests flow; `failure_threshold` consecutive failures open it
+    open       requests are refused for `reset_timeout` seconds
+    half-open  one probe request is let through: success closes the
+               circuit, failure opens it again
+
+    Every transition is counted and passed to the listeners as
+    (old_state, new_state); listeners run on the calling thread.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.rejected = 0
+        self.transitions = {}   # (old, new) → count
+        self._listeners = []
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _set_state(self, new):
+        """
+        Caller holds the lock; returns the transition to announce, or None.
+        """
+        old = self._state
+        if old == new:
+            return None
+        self._state = new
+        self.transitions[(old, new)] = self.transitions.get((old, new), 0) + 1
+        if new == self.OPEN:
+            self._opened_at = self._clock()
+        return old, new
+
+    def _announce(self, transition):
+        if transition is None:
+            return
+        for fn in list(self._listeners):
+            fn(*transition)
+
+    # ----------------------------------------------------
+    # Request outcome
+    # ----------------------------------------------------
+    def allow(self):
+        """
+        True if a request may be sent now.
+        """
+        transition = None
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                transition = self._set_state(self.HALF_OPEN)
+
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    allowed = False
+                else:
+                    self._probing = allowed = True
+            else:
+                allowed = True
+
+        self._announce(transition)
+        return allowed
+
+    def release(self):
+        """
+        The allowed request was not sent after all: free the half-open
+        probe without counting an outcome.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            transition = self._set_state(self.CLOSED)
+        self._announce(transition)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            transition = None
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                transition = self._set_state(self.OPEN)
+                # A re-open restarts the wait even when already open
+                self._opened_at = self._clock()
+        self._announce(transition)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self.rejected,
+                "transitions": {f"{a}->{b}": n for (a, b), n in self.transitions.items()},
+            }
@@ -0,0 +1,160 @@
+import random
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from workers import TaskRunner
+
+
+# Poll intervals (seconds) by minutes until the nearest bus
+FAST_INTERVAL = 10      # a bus is ≤ 2 min away
+NORMAL_INTERVAL = 20    # nearest bus ≤ 10 min
+SLOW_INTERVAL = 45      # nothing close
+IDLE_INTERVAL = 60      # no arrivals at all
+
+ERROR_BACKOFF = 15      # first retry after a failure, doubled each time
+MAX_BACKOFF = 300
+AUTH_BACKOFF = 600      # 401: the token will not fix itself soon
+
+JITTER = 0.1            # ±10 % so kiosks do not poll in lockstep
+
+
+def next_poll_interval(nearest_min=None, failures=0, unauthorized=False, jitter=JITTER):
+    """
+    Seconds until the next poll of a stop.
+    Faster when a bus is about to arrive, exponential backoff on errors.
+    """
+    if unauthorized:
+        base = AUTH_BACKOFF
+    elif failures:
+        base = min(ERROR_BACKOFF * 2 ** (failures - 1), MAX_BACKOFF)
+    elif nearest_min is None:
+        base = IDLE_INTERVAL
+    elif nearest_min <= 2:
+        base = FAST_INTERVAL
+    elif nearest_min <= 10:
+        base = NORMAL_INTERVAL
+    else:
+        base = SLOW_INTERVAL
+
+    return base * random.uniform(1 - jitter, 1 + jitter)
+
+
+class _Watch:
+    """
+    Polling state of one stop, shared by all its watchers.
+    """
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.watchers = 1
+        self.failures = 0
+
+
+class ArrivalsScheduler(QObject):
+    """
+    Re-polls watched stops in the background through
+    BusModel.fetch_arrivals, at an interval adapted to the nearest ETA.
+
+    Watchers of the same stop are coalesced: one timer and at most one
+    request in flight per stop, whatever the number of watchers.
+    """
+
+    arrivalsUpdated = pyqtSignal(str, object)   # stop_id, fetch_arrivals() result
+    arrivalsFailed = pyqtSignal(str, object)    # stop_id, exception
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.runner = TaskRunner(self)
+        self._watches = {}
+
+    # ----------------------------------------------------
+    # Watch management
+    # ----------------------------------------------------
+    def watch(self, stop_id):
+        """
+        Start (or join) polling of a stop. The first watcher triggers
+        an immediate fetch.
+        """
+        w = self._watches.get(stop_id)
+        if w is not None:
+            w.watchers += 1
+            return
+
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self._poll(stop_id))
+        self._watches[stop_id] = _Watch(timer)
+        self._poll(stop_id)
+
+    def unwatch(self, stop_id):
+        w = self._watches.get(stop_id)
+        if w is None:
+            return
+
+        w.watchers -= 1
+        if w.watchers > 0:
+            return
+
+        w.timer.stop()
+        w.timer.deleteLater()
+        del self._watches[stop_id]
+        self.runner.cancel(self._channel(stop_id))
+
+    def watched(self):
+        return list(self._watches)
+
+    def poll_now(self, stop_id):
+        if stop_id in self._watches:
+            self._poll(stop_id)
+
+    # ----------------------------------------------------
+    # Polling
+    # ----------------------------------------------------
+    @staticmethod
+    def _channel(stop_id):
+        return f"poll:{stop_id}"
+
+    def _poll(self, stop_id):
+        channel = self._channel(stop_id)
+        if stop_id not in self._watches or self.runner.is_busy(channel):
+            return
+
+        self._watches[stop_id].timer.stop()
+        self.runner.submit(
+            channel, self.model.fetch_arrivals, stop_id,
+            on_done=lambda result: self._on_result(stop_id, result),
+            on_error=lambda e: self._on_error(stop_id, e),
+        )
+
+    def _schedule(self, stop_id, seconds):
+        w = self._watches.get(stop_id)
+        if w is not None:
+            w.timer.start(int(seconds * 1000))
+
+    def _on_result(self, stop_id, result):
+        w = self._watches.get(stop_id)
+        if w is None:
+            return
+
+        w.failures = 0
+        minutes = [bus["minutes"] for bus in result["data"]]
+        self._schedule(stop_id, next_poll_interval(min(minutes, default=None)))
+        self.arrivalsUpdated.emit(stop_id, result)
+
+    def _on_error(self, stop_id, error):
+        w = self._watches.get(stop_id)
+        if w is None:
+            return
+
+        if isinstance(error, PermissionError):
+            interval = next_poll_interval(unauthorized=True)
+        elif isinstance(error, LookupError):
+            # Unknown stop or no buses right now: not a transport failure
+            interval = next_poll_interval()
+        else:
+            w.failures += 1
+            interval = next_poll_interval(failures=w.failures)
+
+        self._schedule(stop_id, interval)
+        self.arrivalsFailed.emit(stop_id, error)
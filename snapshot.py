@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from PyQt6.QtCore import QStandardPaths
+
+
+# The per-user data directory is named after the application: the GUI and
+# the crawler both set it, so they share one snapshot
+APP_NAME = "EMT Palma Bus"
+FILE_NAME = "emt_snapshot.sqlite3"
+
+SnapshotEntry = namedtuple("SnapshotEntry", "data etag last_modified fetched_at size")
+
+
+def default_path():
+    """
+    EMT_SNAPSHOT_PATH if set, else the snapshot file in the per-user
+    application data directory (created if missing).
+    """
+    path = os.environ.get("EMT_SNAPSHOT_PATH")
+    if path:
+        return path
+
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, FILE_NAME)
+
+
+class NetworkSnapshot:
+    """
+    On-disk copy of the static EMT network (lines, sublines, directions,
+    trip stops and shapes) stored in SQLite.
+    Rows are keyed like the memory cache (template + path args + params)
+    and keep the validators needed for conditional revalidation.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key           TEXT PRIMARY KEY,
+            template      TEXT NOT NULL,
+            body          TEXT NOT NULL,
+            etag          TEXT,
+            last_modified TEXT,
+            fetched_at    REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_template ON responses(template);
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = default_path()
+        self.path = path
+        self._lock = threading.Lock()
+
+        # Shared by the GUI thread and background revalidation
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _encode_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    # ----------------------------------------------------
+    # Read
+    # ----------------------------------------------------
+    def load(self, key):
+        """
+        Return the SnapshotEntry stored for a cache key, or None.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (self._encode_key(key),),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        body, etag, last_modified, fetched_at = row
+        return SnapshotEntry(json.loads(body), etag, last_modified, fetched_at, len(body))
+
+    def entries(self, template):
+        """
+        Yield (path_args, params, data) for every stored response of a template.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, body FROM responses WHERE template = ?", (template,)
+            ).fetchall()
+
+        for key, body in rows:
+            _, path, params = json.loads(key)
+            yield dict(path), dict(params), json.loads(body)
+
+    # ----------------------------------------------------
+    # Write
+    # ----------------------------------------------------
+    def save(self, key, data, etag=None, last_modified=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (self._encode_key(key), key[0], json.dumps(data),
+                 etag, last_modified, time.time()),
+            )
+
+    def touch(self, key):
+        """
+        Mark an entry as confirmed by the server (HTTP 304).
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE responses SET fetched_at = ? WHERE key = ?",
+                (time.time(), self._encode_key(key)),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,110 @@
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from PyQt6.QtCore import QEvent, QObject
+
+
+# Set EMT_STARTUP_REPORT=1 to print where startup time goes
+ENABLED = os.environ.get("EMT_STARTUP_REPORT") == "1"
+
+_t0 = time.perf_counter()
+_steps = []     # (label, started_at, duration), seconds since _t0
+_imports = {}   # module → inclusive import time of its first import
+
+
+def elapsed():
+    return time.perf_counter() - _t0
+
+
+# ----------------------------------------------------
+# Timing
+# ----------------------------------------------------
+@contextmanager
+def step(label):
+    """
+    Time a startup phase: `with step("model"): model = BusModel()`.
+    """
+    start = elapsed()
+    try:
+        yield
+    finally:
+        _steps.append((label, start, elapsed() - start))
+
+
+def mark(label):
+    """
+    Record a point in time (e.g. first paint).
+    """
+    _steps.append((label, elapsed(), None))
+
+
+def track_imports():
+    """
+    Time the first import of every module from now on (only when the
+    report is enabled; wraps builtins.__import__).
+    """
+    if not ENABLED or getattr(builtins.__import__, "_emt_timed", False):
+        return
+
+    original = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            _imports.setdefault(name, time.perf_counter() - start)
+
+    timed_import._emt_timed = True
+    builtins.__import__ = timed_import
+
+
+# ----------------------------------------------------
+# First paint
+# ----------------------------------------------------
+class _FirstPaintFilter(QObject):
+    def __init__(self, widget, callbacks):
+        super().__init__(widget)
+        self.callbacks = callbacks
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            mark("first paint")
+            for callback in self.callbacks:
+                callback()
+            self.deleteLater()
+        return False
+
+
+def after_first_paint(widget, *callbacks):
+    """
+    Run callbacks once the widget has painted for the first time
+    (and print the startup report if enabled).
+    """
+    if ENABLED:
+        callbacks += (report,)
+    widget.installEventFilter(_FirstPaintFilter(widget, list(callbacks)))
+
+
+# ----------------------------------------------------
+# Report
+# ----------------------------------------------------
+def report(file=None, top=15):
+    file = file or sys.stderr
+    print("\nStartup timeline (ms since main.py started)", file=file)
+    for label, start, duration in _steps:
+        took = f"{duration * 1000:8.1f} ms" if duration is not None else " " * 11
+        print(f"  {start * 1000:8.1f}  {took}  {label}", file=file)
+
+    if _imports:
+        print(f"\nSlowest first imports (inclusive, top {top})", file=file)
+        slowest = sorted(_imports.items(), key=lambda item: item[1], reverse=True)[:top]
+        for name, duration in slowest:
+            print(f"  {duration * 1000:8.1f} ms  {name}", file=file)
+    file.flush()
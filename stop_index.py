@@ -0,0 +1,255 @@
+import bisect
+import heapq
+import math
+import threading
+import unicodedata
+from collections import defaultdict, namedtuple
+
+
+EARTH_RADIUS = 6371008.8
+
+# Grid cell size in degrees (~550 m north–south around Palma)
+CELL_DEG = 0.005
+
+# Minimum share of query trigrams a name must contain to be a fuzzy match
+FUZZY_MIN_SCORE = 0.4
+
+
+StopRecord = namedtuple("StopRecord", "code name lat lon lines")
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in metres.
+    """
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def fold(text):
+    """
+    Lowercase and strip accents: "Plaça d'Espanya" → "placa d'espanya".
+    """
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _words(text):
+    return "".join(c if c.isalnum() else " " for c in fold(text)).split()
+
+
+def _trigrams(text):
+    padded = f"  {' '.join(_words(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StopIndex:
+    """
+    Every known stop (code → name, coordinates, serving lines) with:
+    - a uniform lat/lon grid for radius and k-nearest queries
+    - sorted code / word lists for prefix search
+    - a trigram index for typo-tolerant name search
+
+    Stops are added as routes are loaded; the search tables are rebuilt
+    lazily on the next search after a change. Thread-safe.
+    """
+
+    def __init__(self, cell=CELL_DEG):
+        self.cell = cell
+        self._lock = threading.Lock()
+
+        self._stops = {}                 # code → StopRecord
+        self._grid = defaultdict(set)    # (row, col) → {code}
+
+        # Search tables, rebuilt when _dirty
+        self._dirty = False
+        self._codes = []                 # sorted stop codes
+        self._words = []                 # sorted (word, code)
+        self._grams = {}                 # trigram → {code}
+        self._gram_counts = {}           # code → number of name trigrams
+
+    def __len__(self):
+        return len(self._stops)
+
+    def __contains__(self, code):
+        return str(code) in self._stops
+
+    def get(self, code):
+        return self._stops.get(str(code))
+
+    def _cell_of(self, lat, lon):
+        return int(math.floor(lat / self.cell)), int(math.floor(lon / self.cell))
+
+    # ----------------------------------------------------
+    # Building
+    # ----------------------------------------------------
+    def add(self, code, name, lat, lon, line=None):
+        """
+        Add a stop, or merge another serving line into a known one.
+        """
+        code = str(code)
+        with self._lock:
+            old = self._stops.get(code)
+            lines = old.lines if old else ()
+            if line is not None and line not in lines:
+                lines = tuple(sorted(lines + (line,), key=lambda c: (len(c), c)))
+
+            if old and (old.lat, old.lon) != (lat, lon):
+                self._grid[self._cell_of(old.lat, old.lon)].discard(code)
+            self._grid[self._cell_of(lat, lon)].add(code)
+
+            self._stops[code] = StopRecord(code, name, lat, lon, lines)
+            if old is None or old.name != name:
+                self._dirty = True
+
+    def add_route(self, stops, line=None):
+        """
+        Add the (stop_code, lat, lon, name) tuples of one route.
+        """
+        for code, lat, lon, name in stops:
+            self.add(code, name, lat, lon, line)
+
+    # ----------------------------------------------------
+    # Spatial queries
+    # ----------------------------------------------------
+    def _cells_around(self, lat, lon, rings):
+        row, col = self._cell_of(lat, lon)
+        for r in range(row - rings, row + rings + 1):
+            for c in range(col - rings, col + rings + 1):
+                yield from self._grid.get((r, c), ())
+
+    def _rings_for(self, lat, radius):
+        # Cells are narrower east–west than north–south away from the equator
+        deg = radius / (EARTH_RADIUS * math.pi / 180)
+        deg /= max(math.cos(math.radians(lat)), 0.01)
+        return int(math.ceil(deg / self.cell))
+
+    def within(self, lat, lon, radius):
+        """
+        [(distance_m, StopRecord)] closer than radius metres, nearest first.
+        """
+        with self._lock:
+            found = []
+            for code in self._cells_around(lat, lon, self._rings_for(lat, radius)):
+                stop = self._stops[code]
+                d = haversine(lat, lon, stop.lat, stop.lon)
+                if d <= radius:
+                    found.append((d, stop))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def nearest(self, lat, lon, k=5, max_radius=5000):
+        """
+        The k stops nearest to a point (within max_radius metres), as
+        [(distance_m, StopRecord)]. Searches outwards ring by ring.
+        """
+        max_rings = self._rings_for(lat, max_radius)
+        row, col = self._cell_of(lat, lon)
+        # Guaranteed search radius after n rings (the shorter cell side)
+        ring_metres = self.cell * EARTH_RADIUS * math.pi / 180 * math.cos(math.radians(lat))
+
+        with self._lock:
+            heap = []   # max-heap of the k best: (-distance, code)
+            for ring in range(max_rings + 1):
+                for r in range(row - ring, row + ring + 1):
+                    for c in range(col - ring, col + ring + 1):
+                        if max(abs(r - row), abs(c - col)) != ring:
+                            continue   # inner cells were done already
+                        for code in self._grid.get((r, c), ()):
+                            stop = self._stops[code]
+                            d = haversine(lat, lon, stop.lat, stop.lon)
+                            if d > max_radius:
+                                continue
+                            if len(heap) < k:
+                                heapq.heappush(heap, (-d, code))
+                            elif d < -heap[0][0]:
+                                heapq.heapreplace(heap, (-d, code))
+
+                # Anything in further rings is at least ring * ring_metres away
+                if len(heap) == k and -heap[0][0] <= ring * ring_metres:
+                    break
+
+            result = [(-d, self._stops[code]) for d, code in heap]
+
+        result.sort(key=lambda item: item[0])
+        return result
+
+    # ----------------------------------------------------
+    # Text search
+    # ----------------------------------------------------
+    def _rebuild_search(self):
+        words = []
+        grams = defaultdict(set)
+        counts = {}
+        for code, stop in self._stops.items():
+            for word in set(_words(stop.name)):
+                words.append((word, code))
+            name_grams = _trigrams(stop.name)
+            counts[code] = len(name_grams)
+            for gram in name_grams:
+                grams[gram].add(code)
+
+        self._codes = sorted(self._stops)
+        self._words = sorted(words)
+        self._grams = dict(grams)
+        self._gram_counts = counts
+        self._dirty = False
+
+    def _codes_with_prefix(self, prefix):
+        i = bisect.bisect_left(self._codes, prefix)
+        while i < len(self._codes) and self._codes[i].startswith(prefix):
+            yield self._codes[i]
+            i += 1
+
+    def _codes_with_word(self, prefix):
+        """
+        Codes of stops with a name word starting with prefix.
+        """
+        i = bisect.bisect_left(self._words, (prefix,))
+        while i < len(self._words) and self._words[i][0].startswith(prefix):
+            yield self._words[i][1]
+            i += 1
+
+    def search(self, query, limit=10):
+        """
+        Stops matching a code prefix ("12" → 12, 120, 1234…) or name words
+        ("pl esp" → Plaça d'Espanya), falling back to trigram similarity
+        for misspellings. Best matches first.
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        with self._lock:
+            if self._dirty:
+                self._rebuild_search()
+
+            if query.isdigit():
+                codes = sorted(self._codes_with_prefix(query), key=lambda c: (len(c), c))
+                return [self._stops[c] for c in codes[:limit]]
+
+            words = _words(query)
+            matches = None
+            for word in words:
+                codes = set(self._codes_with_word(word))
+                matches = codes if matches is None else matches & codes
+            if matches:
+                ranked = sorted(matches, key=lambda c: fold(self._stops[c].name))
+                return [self._stops[c] for c in ranked[:limit]]
+
+            # Fuzzy: names sharing enough of the query's trigrams, ranked
+            # by Dice similarity so close-length names win
+            grams = _trigrams(query)
+            shared = defaultdict(int)
+            for gram in grams:
+                for code in self._grams.get(gram, ()):
+                    shared[code] += 1
+
+            candidates = [(2 * n / (len(grams) + self._gram_counts[code]), code)
+                          for code, n in shared.items()
+                          if n / len(grams) >= FUZZY_MIN_SCORE]
+            best = heapq.nlargest(limit, candidates)
+            return [self._stops[code] for _, code in best]
@@ -0,0 +1,166 @@
+"""
+ApiClient resilience against a local server that misbehaves.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from api_client import ApiClient, CircuitOpenError, ThrottledError, cache_key
+from cache import ResponseCache
+from resilience import CircuitBreaker, TokenBucket
+
+
+class TruncatingHandler(BaseHTTPRequestHandler):
+    """
+    Announces a longer body than it sends, then drops the connection.
+    """
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "100")
+        self.end_headers()
+        self.wfile.write(b'{"lines": [')
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """
+    Always answers 503.
+    """
+
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+@pytest.fixture
+def truncating_base():
+    server, base = _serve(TruncatingHandler)
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def unavailable_base():
+    server, base = _serve(UnavailableHandler)
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    return now
+
+
+def test_truncated_body_settles_half_open_probe(truncating_base, clock):
+    api = ApiClient(base=truncating_base)
+    api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: clock[0])
+
+    # Open the circuit, then let the reset timeout pass: next request is the probe
+    api.breaker.record_failure()
+    assert api.breaker.state == CircuitBreaker.OPEN
+    clock[0] += 31
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        api.get_lines_raw()
+
+    # The failed probe re-opened the circuit instead of leaving it half-open
+    assert api.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        api.get_lines_raw()
+
+    # After another timeout a new probe is let through
+    clock[0] += 31
+    assert api.breaker.allow()
+    api.close()
+
+
+def test_truncated_body_counts_as_failure_when_closed(truncating_base):
+    api = ApiClient(base=truncating_base)
+    api.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            api.get_lines_raw()
+
+    assert api.breaker.state == CircuitBreaker.OPEN
+    api.close()
+
+
+def test_open_circuit_fails_fast_without_spending_a_token():
+    api = ApiClient(base="http://127.0.0.1:9")
+    api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    api.breaker.record_failure()
+    api.limiter = TokenBucket(rate=0.001, capacity=1)
+
+    with pytest.raises(CircuitOpenError):
+        api.get_lines_raw()
+
+    assert api.limiter.try_acquire()
+    api.close()
+
+
+def test_throttled_request_serves_stale_cache():
+    clock = [0.0]
+    api = ApiClient(base="http://127.0.0.1:9", cache=ResponseCache(clock=lambda: clock[0]))
+    api.cache.put(cache_key("/lines/", None, {}), {"lines": [{"id": 3}]}, ttl=10)
+    clock[0] += 11
+    api.limiter = TokenBucket(rate=0.001, capacity=1)
+    api.limiter.try_acquire()
+    api.THROTTLE_WAIT = 0
+
+    assert api.get_lines_raw() == [{"id": 3}]
+    assert api.served_stale == 1
+    api.close()
+
+
+def test_retry_without_a_token_is_not_sent(unavailable_base):
+    api = ApiClient(base=unavailable_base)
+    api.limiter = TokenBucket(rate=0.001, capacity=1)
+    api.THROTTLE_WAIT = 0
+    api.RETRY_BACKOFF = 0
+
+    with pytest.raises(ThrottledError):
+        api.get_lines_raw()
+
+    # One attempt went out (and failed); the retry was refused
+    assert api.retries == 1
+    assert api.breaker.metrics()["consecutive_failures"] == 1
+    api.close()
+
+
+def test_throttled_probe_releases_half_open(clock):
+    api = ApiClient(base="http://127.0.0.1:9")
+    api.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: clock[0])
+    api.breaker.record_failure()
+    clock[0] += 31
+    api.limiter = TokenBucket(rate=0.001, capacity=1)
+    api.limiter.try_acquire()
+    api.THROTTLE_WAIT = 0
+
+    with pytest.raises(ThrottledError):
+        api.get_lines_raw()
+
+    # The probe was never sent, so the next request may still probe
+    assert api.breaker.allow()
+    api.close()
@@ -0,0 +1,98 @@
+"""
+ResponseCache expiry, LRU eviction and invalidation.
+"""
+import pytest
+
+from cache import MISSING, ResponseCache
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    return now
+
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(max_bytes=100, clock=lambda: clock[0])
+
+
+def test_entry_expires_after_ttl(cache, clock):
+    cache.put(("/lines/",), "lines", ttl=10)
+
+    clock[0] = 9.9
+    assert cache.get(("/lines/",)) == "lines"
+
+    clock[0] = 10
+    assert cache.get(("/lines/",)) is MISSING
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_first(cache):
+    cache.put(("a",), "a", ttl=60, size=40)
+    cache.put(("b",), "b", ttl=60, size=40)
+    cache.get(("a",))   # b is now the oldest
+
+    cache.put(("c",), "c", ttl=60, size=40)
+
+    assert cache.get(("b",)) is MISSING
+    assert cache.get(("a",)) == "a"
+    assert cache.get(("c",)) == "c"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 80
+
+
+def test_replacing_a_key_does_not_double_count(cache):
+    cache.put(("a",), "old", ttl=60, size=60)
+    cache.put(("a",), "new", ttl=60, size=60)
+
+    assert cache.get(("a",)) == "new"
+    assert cache.stats() == {"hits": 1, "misses": 0, "evictions": 0, "entries": 1, "bytes": 60}
+
+
+def test_oversized_value_is_not_stored(cache):
+    cache.put(("a",), "a", ttl=60, size=10)
+    cache.put(("big",), "big", ttl=60, size=101)
+
+    assert cache.get(("big",)) is MISSING
+    assert cache.get(("a",)) == "a"
+
+
+def test_get_stale_within_max_stale(cache, clock):
+    cache.put(("/lines/",), "lines", ttl=10)
+
+    clock[0] = 20
+    assert cache.get(("/lines/",)) is MISSING
+    assert cache.get_stale(("/lines/",)) == "lines"
+    assert cache.get_stale(("/lines/",), max_stale=11) == "lines"
+    assert cache.get_stale(("/lines/",), max_stale=10) is MISSING
+    assert cache.get_stale(("/stops/",)) is MISSING
+
+
+def test_invalidate_one_template(cache):
+    cache.put(("/stops/{stop}/timestr", "42"), "arrivals", ttl=60, size=10)
+    cache.put(("/stops/{stop}/timestr", "7"), "arrivals", ttl=60, size=10)
+    cache.put(("/lines/",), "lines", ttl=60, size=10)
+
+    cache.invalidate("/stops/{stop}/timestr")
+
+    assert cache.get_stale(("/stops/{stop}/timestr", "42")) is MISSING
+    assert cache.get_stale(("/stops/{stop}/timestr", "7")) is MISSING
+    assert cache.get(("/lines/",)) == "lines"
+    assert cache.stats()["bytes"] == 10
+
+
+def test_invalidate_everything_and_discard(cache):
+    cache.put(("a",), "a", ttl=60, size=10)
+    cache.put(("b",), "b", ttl=60, size=10)
+
+    cache.discard(("a",))
+    cache.discard(("missing",))
+    assert cache.get_stale(("a",)) is MISSING
+    assert cache.stats()["bytes"] == 10
+
+    cache.invalidate()
+    assert cache.get_stale(("b",)) is MISSING
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,60 @@
+"""
+NetworkCrawler leaves the caller's ApiClient as it found it.
+"""
+import pytest
+
+from api_client import ApiClient
+from crawler import NetworkCrawler
+from resilience import TokenBucket
+from snapshot import NetworkSnapshot
+
+
+@pytest.fixture
+def api(tmp_path):
+    snapshot = NetworkSnapshot(str(tmp_path / "snapshot.sqlite3"))
+    client = ApiClient(base="http://127.0.0.1:9", snapshot=snapshot)
+    yield client
+    client.close()
+    snapshot.close()
+
+
+def test_overrides_client_settings_only_while_crawling(api, monkeypatch):
+    limiter = api.limiter
+    api.RETRIES = 5   # instance override, kept as is
+    crawler = NetworkCrawler(api, rate=3)
+    assert api.limiter is limiter
+
+    seen = {}
+
+    def lines():
+        seen.update(limiter=api.limiter, wait=api.THROTTLE_WAIT, retries=api.RETRIES)
+        return []
+
+    monkeypatch.setattr(crawler, "_lines", lines)
+    crawler.crawl()
+
+    assert isinstance(seen["limiter"], TokenBucket) and seen["limiter"] is not limiter
+    assert seen["limiter"].rate == 3
+    assert seen["wait"] is None
+    assert seen["retries"] == 0
+
+    assert api.limiter is limiter
+    assert api.RETRIES == 5
+    assert api.THROTTLE_WAIT == ApiClient.THROTTLE_WAIT
+    assert "THROTTLE_WAIT" not in vars(api)
+
+
+def test_restores_client_settings_when_crawl_fails(api, monkeypatch):
+    limiter = api.limiter
+    crawler = NetworkCrawler(api)
+
+    def lines():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(crawler, "_lines", lines)
+    with pytest.raises(RuntimeError):
+        crawler.crawl()
+
+    assert api.limiter is limiter
+    assert api.RETRIES == ApiClient.RETRIES
+    assert api.THROTTLE_WAIT == ApiClient.THROTTLE_WAIT
@@ -0,0 +1,97 @@
+"""
+Polyline encoding and Douglas–Peucker simplification.
+"""
+import math
+import random
+
+import pytest
+
+import geometry
+from geometry import (
+    decode_polyline, encode_polyline, simplify, simplify_for_zooms, tolerance_for_zoom,
+)
+
+
+# Example from Google's encoded polyline algorithm format documentation
+GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def _route(n, seed=7):
+    """
+    A wiggly random walk through Palma, like a bus route shape.
+    """
+    rng = random.Random(seed)
+    lat, lon, heading = 39.5696, 2.6502, 0.0
+    points = []
+    for _ in range(n):
+        heading += rng.gauss(0, 0.3)
+        lat += 0.0002 * math.cos(heading) + rng.gauss(0, 0.00001)
+        lon += 0.0002 * math.sin(heading) + rng.gauss(0, 0.00001)
+        points.append((lat, lon))
+    return points
+
+
+# ----------------------------------------------------
+# Encoded polyline
+# ----------------------------------------------------
+def test_encodes_google_example():
+    assert encode_polyline(GOOGLE_POINTS) == GOOGLE_ENCODED
+
+
+def test_decodes_google_example():
+    assert decode_polyline(GOOGLE_ENCODED) == pytest.approx(GOOGLE_POINTS)
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_round_trip(precision):
+    points = _route(500) + [(-33.86785, 151.20732), (0.0, 0.0), (-0.00001, -179.99999)]
+    decoded = decode_polyline(encode_polyline(points, precision), precision)
+
+    assert len(decoded) == len(points)
+    for (lat, lon), (dlat, dlon) in zip(points, decoded):
+        assert abs(lat - dlat) <= 0.5 / 10 ** precision + 1e-12
+        assert abs(lon - dlon) <= 0.5 / 10 ** precision + 1e-12
+
+
+def test_empty_polyline():
+    assert encode_polyline([]) == ""
+    assert decode_polyline("") == []
+
+
+# ----------------------------------------------------
+# Simplification
+# ----------------------------------------------------
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 10.0, 50.0])
+def test_numpy_and_fallback_keep_the_same_points(tolerance):
+    pytest.importorskip("numpy")
+    xs, ys = geometry._project(_route(2000))
+
+    assert geometry._keep_mask_numpy(xs, ys, tolerance) == \
+        geometry._keep_mask_python(xs, ys, tolerance)
+
+
+def test_simplify_without_numpy(monkeypatch):
+    points = _route(2000)
+    keep = geometry._keep_mask_python(*geometry._project(points), 10.0)
+    expected = [p for p, k in zip(points, keep) if k]
+
+    monkeypatch.setattr(geometry, "np", None)
+    assert simplify(points, 10.0) == expected
+
+
+def test_simplify_keeps_endpoints_and_drops_collinear_points():
+    line = [(39.57, 2.65 + i * 0.0001) for i in range(50)]
+
+    assert simplify(line, 1.0) == [line[0], line[-1]]
+    assert simplify(line[:2], 1.0) == line[:2]
+    assert simplify(line, 0) == line
+
+
+def test_coarser_zooms_keep_fewer_points():
+    points = _route(2000)
+    by_zoom = simplify_for_zooms(points, zooms=(12, 14, 16))
+
+    assert len(by_zoom[12]) <= len(by_zoom[14]) <= len(by_zoom[16]) <= len(points)
+    assert tolerance_for_zoom(12) == pytest.approx(4 * tolerance_for_zoom(14))
+    assert simplify_for_zooms([]) == {z: [] for z in geometry.SHAPE_ZOOMS}
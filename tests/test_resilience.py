@@ -0,0 +1,157 @@
+"""
+TokenBucket refill and waiting, CircuitBreaker state machine.
+"""
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, TokenBucket
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    return now
+
+
+@pytest.fixture
+def sleeps(clock, monkeypatch):
+    """
+    time.sleep() inside resilience advances the fake clock instead.
+    """
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(resilience.time, "sleep", sleep)
+    return slept
+
+
+# ----------------------------------------------------
+# TokenBucket
+# ----------------------------------------------------
+def test_bucket_starts_full_and_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=3, clock=lambda: clock[0])
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+    clock[0] = 0.5   # one token back
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock[0] = 100   # refill stops at capacity
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_acquire_waits_for_the_next_token(clock, sleeps):
+    bucket = TokenBucket(rate=4, capacity=1, clock=lambda: clock[0])
+    assert bucket.acquire()
+
+    assert bucket.acquire(timeout=1)
+    assert sleeps == [pytest.approx(0.25)]
+
+
+def test_acquire_gives_up_past_timeout(clock, sleeps):
+    bucket = TokenBucket(rate=1, capacity=1, clock=lambda: clock[0])
+    assert bucket.try_acquire()
+
+    assert not bucket.acquire(timeout=0.5)
+    assert sleeps == []
+    assert bucket.acquire(timeout=1)
+
+
+# ----------------------------------------------------
+# CircuitBreaker
+# ----------------------------------------------------
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: clock[0])
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()   # resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.metrics()["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    _trip(breaker)
+
+    clock[0] = 29.9
+    assert not breaker.allow()
+
+    clock[0] = 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()   # probe in flight
+
+
+def test_probe_success_closes(breaker, clock):
+    _trip(breaker)
+    clock[0] = 30
+    assert breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens_for_another_timeout(breaker, clock):
+    _trip(breaker)
+    clock[0] = 30
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] = 59.9
+    assert not breaker.allow()
+    clock[0] = 60
+    assert breaker.allow()
+
+
+def test_release_frees_the_probe(breaker, clock):
+    _trip(breaker)
+    clock[0] = 30
+    assert breaker.allow()
+
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_transitions_are_counted_and_announced(breaker, clock):
+    seen = []
+    breaker.add_listener(lambda old, new: seen.append((old, new)))
+
+    _trip(breaker)
+    clock[0] = 30
+    breaker.allow()
+    breaker.record_success()
+
+    assert seen == [
+        (CircuitBreaker.CLOSED, CircuitBreaker.OPEN),
+        (CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN),
+        (CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED),
+    ]
+    assert breaker.metrics()["transitions"] == {
+        "closed->open": 1, "open->half-open": 1, "half-open->closed": 1,
+    }
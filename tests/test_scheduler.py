@@ -0,0 +1,46 @@
+"""
+Adaptive poll interval of watched stops.
+"""
+import pytest
+
+from scheduler import (
+    AUTH_BACKOFF, ERROR_BACKOFF, FAST_INTERVAL, IDLE_INTERVAL, JITTER, MAX_BACKOFF,
+    NORMAL_INTERVAL, SLOW_INTERVAL, next_poll_interval,
+)
+
+
+@pytest.mark.parametrize("nearest_min, expected", [
+    (None, IDLE_INTERVAL),
+    (0, FAST_INTERVAL),
+    (2, FAST_INTERVAL),
+    (3, NORMAL_INTERVAL),
+    (10, NORMAL_INTERVAL),
+    (11, SLOW_INTERVAL),
+    (90, SLOW_INTERVAL),
+])
+def test_interval_follows_nearest_bus(nearest_min, expected):
+    assert next_poll_interval(nearest_min, jitter=0) == expected
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    intervals = [next_poll_interval(failures=n, jitter=0) for n in range(1, 8)]
+
+    assert intervals[:4] == [ERROR_BACKOFF, 2 * ERROR_BACKOFF, 4 * ERROR_BACKOFF, 8 * ERROR_BACKOFF]
+    assert intervals[-1] == MAX_BACKOFF
+    assert intervals == sorted(intervals)
+
+
+def test_failures_win_over_a_close_bus():
+    assert next_poll_interval(1, failures=1, jitter=0) == ERROR_BACKOFF
+
+
+def test_unauthorized_waits_longest():
+    assert next_poll_interval(1, failures=3, unauthorized=True, jitter=0) == AUTH_BACKOFF
+
+
+def test_jitter_stays_within_bounds():
+    intervals = [next_poll_interval(5) for _ in range(500)]
+
+    assert min(intervals) >= NORMAL_INTERVAL * (1 - JITTER)
+    assert max(intervals) <= NORMAL_INTERVAL * (1 + JITTER)
+    assert len(set(intervals)) > 1
@@ -0,0 +1,113 @@
+"""
+StopIndex spatial queries against a brute-force scan, and name search.
+"""
+import random
+
+import pytest
+
+from stop_index import StopIndex, fold, haversine
+
+
+# Around Palma
+CENTRE = (39.5696, 2.6502)
+SPREAD = 0.05
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(1234)
+    return [(str(code), CENTRE[0] + rng.uniform(-SPREAD, SPREAD),
+             CENTRE[1] + rng.uniform(-SPREAD, SPREAD))
+            for code in range(1, 801)]
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    index = StopIndex()
+    for code, lat, lon in points:
+        index.add(code, f"Parada {code}", lat, lon)
+    return index
+
+
+def _brute_force(points, lat, lon):
+    return sorted((haversine(lat, lon, plat, plon), code) for code, plat, plon in points)
+
+
+def _queries():
+    rng = random.Random(99)
+    return [(CENTRE[0] + rng.uniform(-1.5 * SPREAD, 1.5 * SPREAD),
+             CENTRE[1] + rng.uniform(-1.5 * SPREAD, 1.5 * SPREAD))
+            for _ in range(50)]
+
+
+@pytest.mark.parametrize("radius", [50, 300, 1200])
+def test_within_matches_brute_force(index, points, radius):
+    for lat, lon in _queries():
+        expected = [code for d, code in _brute_force(points, lat, lon) if d <= radius]
+        found = index.within(lat, lon, radius)
+
+        assert [stop.code for _, stop in found] == expected
+        assert all(d <= radius for d, _ in found)
+
+
+@pytest.mark.parametrize("k, max_radius", [(1, 5000), (5, 5000), (20, 5000), (10, 400)])
+def test_nearest_matches_brute_force(index, points, k, max_radius):
+    for lat, lon in _queries():
+        expected = [(d, code) for d, code in _brute_force(points, lat, lon)
+                    if d <= max_radius][:k]
+        found = index.nearest(lat, lon, k=k, max_radius=max_radius)
+
+        assert [stop.code for _, stop in found] == [code for _, code in expected]
+        assert [d for d, _ in found] == pytest.approx([d for d, _ in expected])
+
+
+def test_moving_a_stop_updates_the_grid():
+    index = StopIndex()
+    index.add("1", "Parada", 39.57, 2.65)
+    index.add("1", "Parada", 39.60, 2.70)
+
+    assert index.within(39.57, 2.65, 100) == []
+    assert [stop.code for _, stop in index.within(39.60, 2.70, 100)] == ["1"]
+
+
+# ----------------------------------------------------
+# Text search
+# ----------------------------------------------------
+@pytest.fixture
+def named():
+    index = StopIndex()
+    index.add_route([
+        ("12", 39.575, 2.654, "Plaça d'Espanya"),
+        ("120", 39.571, 2.646, "Avinguda Alexandre Rosselló"),
+        ("1234", 39.569, 2.650, "Sant Ferran"),
+        ("7", 39.567, 2.648, "PORTO PÍ"),
+    ], line="3")
+    return index
+
+
+def test_fold_strips_accents_and_case():
+    assert fold("Plaça d'Espanya") == "placa d'espanya"
+    assert fold("PORTO PÍ") == "porto pi"
+
+
+@pytest.mark.parametrize("query", ["placa", "PLAÇA", "Plaça d'Espanya", "pl esp", "ESPANYA"])
+def test_search_ignores_accents_and_case(named, query):
+    assert [stop.code for stop in named.search(query)] == ["12"]
+
+
+@pytest.mark.parametrize("query", ["porto pi", "Porto Pí", "pí"])
+def test_search_matches_accented_upper_case_names(named, query):
+    assert [stop.code for stop in named.search(query)] == ["7"]
+
+
+def test_search_by_code_prefix(named):
+    assert [stop.code for stop in named.search("12")] == ["12", "120", "1234"]
+
+
+def test_search_tolerates_typos(named):
+    assert named.search("Rosello")[0].code == "120"
+
+
+def test_serving_lines_are_merged(named):
+    named.add("12", "Plaça d'Espanya", 39.575, 2.654, line="15")
+    assert named.get("12").lines == ("3", "15")
@@ -0,0 +1,345 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emt_tiles.mbtiles")
+
+# Tile source. The public OSM servers are the default, but deployments
+# should point EMT_TILE_URL at their own (or a commercial) tile server.
+OSM_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_URL = os.environ.get("EMT_TILE_URL", OSM_TILE_URL)
+ATTRIBUTION = os.environ.get("EMT_TILE_ATTRIBUTION", "&copy; OpenStreetMap contributors")
+
+# The OSM tile usage policy asks for a User-Agent with contact details:
+# set EMT_TILE_CONTACT to a URL or email of whoever runs the deployment
+TILE_CONTACT = os.environ.get("EMT_TILE_CONTACT", "")
+
+# Hosts whose usage policy forbids bulk downloading (no route prefetch)
+NO_PREFETCH_HOSTS = frozenset({"tile.openstreetmap.org"})
+
+# Served tiles' access times are written once this many are pending,
+# or after this many seconds
+TOUCH_BATCH = 64
+TOUCH_FLUSH_SECONDS = 5
+
+# Zoom levels the route maps actually use
+PREFETCH_ZOOMS = (12, 13, 14, 15)
+PREFETCH_LIMIT = 400   # tiles per route, for tile servers that allow prefetching
+
+
+def deg2tile(lat, lon, zoom):
+    """
+    Slippy-map tile (x, y) containing a WGS84 point.
+    """
+    lat = max(min(lat, 85.0511), -85.0511)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_for_bbox(south, west, north, east, zooms):
+    """
+    Yield (z, x, y) for every tile covering a bounding box.
+    """
+    for z in zooms:
+        x0, y0 = deg2tile(north, west, z)
+        x1, y1 = deg2tile(south, east, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+class TileCache:
+    """
+    Disk-backed map tile cache in MBTiles layout (SQLite, TMS rows).
+    Least recently used tiles are dropped once the store exceeds
+    max_bytes. Misses are fetched from the tile server at url.
+
+    Route prefetch is off for the public OSM servers (their usage policy
+    forbids bulk downloads); EMT_TILE_PREFETCH=1/0 overrides the default.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS tiles (
+            zoom_level  INTEGER NOT NULL,
+            tile_column INTEGER NOT NULL,
+            tile_row    INTEGER NOT NULL,
+            tile_data   BLOB NOT NULL,
+            size        INTEGER NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (zoom_level, tile_column, tile_row)
+        );
+        CREATE INDEX IF NOT EXISTS tiles_lru ON tiles(last_access);
+        INSERT OR IGNORE INTO metadata VALUES ('name', 'EMT Palma tiles');
+        INSERT OR IGNORE INTO metadata VALUES ('format', 'png');
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=200 * 1024 * 1024, url=TILE_URL,
+                 contact=TILE_CONTACT, prefetch=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.url = url
+
+        if prefetch is None:
+            setting = os.environ.get("EMT_TILE_PREFETCH")
+            if setting is not None:
+                prefetch = setting == "1"
+            else:
+                prefetch = urlsplit(url).hostname not in NO_PREFETCH_HOSTS
+        self.prefetch_enabled = prefetch
+        self._lock = threading.Lock()
+
+        # Writes (downloads, eviction, access times) go through _db under
+        # _lock. Lookups use their own read-only connection: with WAL they
+        # never wait for a write, and the GUI thread (emt:// scheme) never
+        # writes or syncs.
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+
+        self._reader = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro",
+                                       uri=True, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+        # Access times of served tiles, written in batches off the GUI thread
+        self._touched = {}   # (z, x, tms row) → last access
+        self._last_flush = time.monotonic()
+
+        # OSM tile policy: identify the app and a contact, at most 2 connections
+        self.session = requests.Session()
+        agent = "EMT-Palma-Bus-App/1.0"
+        if contact:
+            agent += f" (+{contact})"
+        self.session.headers["User-Agent"] = agent
+        self._connections = threading.BoundedSemaphore(2)
+
+        # Tiles the page is waiting for have their own workers; prefetch
+        # runs one tile at a time, and only while none of those is pending
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tiles")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiles-prefetch")
+        self._inflight = {}   # (z, x, y) → Future of a download in progress
+        self._inflight_lock = threading.Lock()
+        self._demand = 0      # on-demand downloads not finished yet
+        self._idle = threading.Event()
+        self._idle.set()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _tms_row(z, y):
+        # MBTiles stores rows bottom-up
+        return (2 ** z - 1) - y
+
+    # ----------------------------------------------------
+    # Cache access
+    # ----------------------------------------------------
+    def get(self, z, x, y):
+        """
+        Cached tile bytes, or None.
+        """
+        row = self._tms_row(z, y)
+        with self._read_lock:
+            found = self._reader.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, row),
+            ).fetchone()
+
+            if found is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._touched[(z, x, row)] = time.time()
+            due = (len(self._touched) >= TOUCH_BATCH
+                   or time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS)
+            if due:
+                self._last_flush = time.monotonic()
+
+        if due:
+            self._executor.submit(self.flush)
+        return bytes(found[0])
+
+    def flush(self):
+        """
+        Write pending access times (used by LRU eviction).
+        """
+        with self._lock, self._db:
+            self._flush_touched()
+
+    def _flush_touched(self):
+        """
+        Caller holds the lock and the transaction.
+        """
+        with self._read_lock:
+            touched, self._touched = self._touched, {}
+        self._db.executemany(
+            "UPDATE tiles SET last_access=? WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+            [(when, *key) for key, when in touched.items()],
+        )
+
+    def put(self, z, x, y, data):
+        row = self._tms_row(z, y)
+        with self._lock, self._db:
+            old = self._db.execute(
+                "SELECT size FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, row),
+            ).fetchone()
+            if old:
+                self._bytes -= old[0]
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?)",
+                (z, x, row, sqlite3.Binary(data), len(data), time.time()),
+            )
+            self._bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used tiles until under the size cap.
+        Caller holds the lock and the transaction.
+        """
+        if self._bytes > self.max_bytes:
+            self._flush_touched()
+        while self._bytes > self.max_bytes:
+            victims = self._db.execute(
+                "SELECT zoom_level, tile_column, tile_row, size FROM tiles "
+                "ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not victims:
+                break
+
+            dropped = []
+            for victim in victims:
+                if self._bytes <= self.max_bytes:
+                    break
+                dropped.append(victim[:3])
+                self._bytes -= victim[3]
+            self._db.executemany(
+                "DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                dropped,
+            )
+
+    # ----------------------------------------------------
+    # Network fallback
+    # ----------------------------------------------------
+    def fetch(self, z, x, y):
+        """
+        Tile bytes from the cache, or from the network on a miss.
+        Returns None if the tile cannot be obtained.
+        """
+        data = self.get(z, x, y)
+        if data is not None:
+            return data
+
+        try:
+            with self._connections:
+                resp = self.session.get(self.url.format(z=z, x=x, y=y), timeout=10)
+            resp.raise_for_status()
+        except requests.RequestException:
+            return None
+
+        self.put(z, x, y, resp.content)
+        return resp.content
+
+    def fetch_async(self, z, x, y):
+        """
+        fetch() for a tile the page is waiting for; returns a Future.
+        A tile already downloading (on demand or prefetch) is not
+        requested twice.
+        """
+        key = (z, x, y)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = self._executor.submit(self.fetch, z, x, y)
+            self._demand += 1
+            self._idle.clear()
+
+        future.add_done_callback(lambda f: self._demand_done(key, f))
+        return future
+
+    def _demand_done(self, key, future):
+        with self._inflight_lock:
+            self._demand -= 1
+            if not self._demand:
+                self._idle.set()
+        self._forget(key, future)
+
+    def _forget(self, key, future):
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def prefetch(self, south, west, north, east, zooms=PREFETCH_ZOOMS, limit=PREFETCH_LIMIT):
+        """
+        Queue download of the tiles covering a bounding box (e.g. a route),
+        skipping tiles already cached. Low priority: visible tiles asked
+        through fetch_async go first. Returns the number queued (always
+        0 when prefetch is disabled for this tile source).
+        """
+        if not self.prefetch_enabled:
+            return 0
+
+        queued = 0
+        for z, x, y in tiles_for_bbox(south, west, north, east, zooms):
+            if queued >= limit:
+                break
+            if self._has(z, x, y):
+                continue
+            self._prefetch_executor.submit(self._prefetch_one, z, x, y)
+            queued += 1
+        return queued
+
+    def _prefetch_one(self, z, x, y):
+        self._idle.wait()
+
+        key = (z, x, y)
+        with self._inflight_lock:
+            # Requested on demand meanwhile (or cached by it already)
+            if key in self._inflight or self._has(z, x, y):
+                return
+            future = self._inflight[key] = Future()
+
+        try:
+            future.set_result(self.fetch(z, x, y))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self._forget(key, future)
+
+    def _has(self, z, x, y):
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, self._tms_row(z, y)),
+            ).fetchone() is not None
+
+    def stats(self):
+        with self._read_lock:
+            count = self._reader.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+        return {"tiles": count, "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._idle.set()
+        self.flush()
+        with self._read_lock:
+            self._reader.close()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,297 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# Phases of an API call, in order
+PHASES = ("connect", "tls", "ttfb", "download", "parse", "format", "total")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# ----------------------------------------------------
+# HDR-style histogram
+# ----------------------------------------------------
+class Histogram:
+    """
+    Log-linear histogram of durations in microseconds: values keep their
+    top SIGNIFICANT_BITS bits, so any quantile is within ~1% of the true
+    value while memory stays bounded (like HdrHistogram).
+    """
+
+    SIGNIFICANT_BITS = 7
+
+    def __init__(self):
+        self.counts = {}   # bucket lower bound (µs) → count
+        self.count = 0
+        self.total = 0     # µs
+        self.min = None
+        self.max = 0
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.SIGNIFICANT_BITS - 1)
+        return (value >> shift) << shift, shift
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1_000_000))
+        bucket, _ = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """
+        Seconds below which a fraction q of the recorded values fall
+        (highest value of the matching bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                _, shift = self._bucket(bucket)
+                return min(bucket + (1 << shift) - 1, self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.total / 1_000_000,
+            "min": (self.min or 0) / 1_000_000,
+            "max": self.max / 1_000_000,
+            **{f"p{int(q * 100)}": self.percentile(q) for q in QUANTILES},
+        }
+
+
+# ----------------------------------------------------
+# Tracer
+# ----------------------------------------------------
+class Trace:
+    """
+    Timings of one API call, tagged by endpoint template.
+    outcome: "network", "cache" (memory or disk) or "error".
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.phases = {}
+        self.outcome = "network"
+        self.status = None
+        self.error = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+class Tracer:
+    """
+    Collects per-call timings into histograms keyed by
+    (endpoint template, phase), and passes every finished Trace to the
+    registered hooks (fn(trace), called on the requesting thread).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms = {}   # (template, phase) → Histogram
+        self._outcomes = {}     # (template, outcome) → count
+        self._hooks = []
+
+    def add_hook(self, fn):
+        self._hooks.append(fn)
+
+    def remove_hook(self, fn):
+        if fn in self._hooks:
+            self._hooks.remove(fn)
+
+    def current(self):
+        """
+        The Trace open on this thread, or None.
+        """
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def trace(self, template):
+        """
+        Open a Trace for one call; phases are added by the layers below
+        (transport, parsing) through current().
+        """
+        outer = self.current()
+        trace = self._local.trace = Trace(template)
+        start = time.perf_counter()
+        try:
+            yield trace
+        except Exception as e:
+            trace.outcome = "error"
+            trace.error = type(e).__name__
+            raise
+        finally:
+            trace.phases["total"] = time.perf_counter() - start
+            self._local.trace = outer
+            self._finish(trace)
+
+    @contextmanager
+    def phase(self, phase, template=None):
+        """
+        Time a phase of the current call, or a standalone phase of a
+        template (e.g. model formatting after the call has finished).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            trace = self.current()
+            if trace is not None and template in (None, trace.template):
+                trace.add(phase, seconds)
+            elif template is not None:
+                self.record(template, phase, seconds)
+
+    def record(self, template, phase, seconds):
+        with self._lock:
+            hist = self._histograms.get((template, phase))
+            if hist is None:
+                hist = self._histograms[(template, phase)] = Histogram()
+            hist.record(seconds)
+
+    def _finish(self, trace):
+        with self._lock:
+            key = (trace.template, trace.outcome)
+            self._outcomes[key] = self._outcomes.get(key, 0) + 1
+        # Cache hits only count; their "total" would drown the network timings
+        if trace.outcome != "cache":
+            for phase, seconds in trace.phases.items():
+                self.record(trace.template, phase, seconds)
+        for fn in list(self._hooks):
+            fn(trace)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._outcomes.clear()
+
+    # ----------------------------------------------------
+    # Export
+    # ----------------------------------------------------
+    def rows(self):
+        """
+        [(template, phase, summary dict)] sorted by template, phase order.
+        """
+        with self._lock:
+            items = [(t, p, h.summary()) for (t, p), h in self._histograms.items()]
+        order = {p: i for i, p in enumerate(PHASES)}
+        items.sort(key=lambda r: (r[0], order.get(r[1], len(order)), r[1]))
+        return items
+
+    def outcomes(self):
+        with self._lock:
+            return dict(self._outcomes)
+
+    def to_json(self, indent=2):
+        endpoints = {}
+        for template, phase, summary in self.rows():
+            endpoints.setdefault(template, {"phases": {}, "outcomes": {}})["phases"][phase] = summary
+        for (template, outcome), n in self.outcomes().items():
+            endpoints.setdefault(template, {"phases": {}, "outcomes": {}})["outcomes"][outcome] = n
+        return json.dumps({"unit": "seconds", "endpoints": endpoints}, indent=indent)
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format (summaries + call counters).
+        """
+        lines = [
+            "# HELP emt_api_phase_seconds EMT API call phase durations.",
+            "# TYPE emt_api_phase_seconds summary",
+        ]
+        for template, phase, s in self.rows():
+            labels = f'endpoint="{_escape(template)}",phase="{phase}"'
+            for q in QUANTILES:
+                lines.append(f'emt_api_phase_seconds{{{labels},quantile="{q}"}} {s[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"emt_api_phase_seconds_sum{{{labels}}} {s['sum']:.6f}")
+            lines.append(f"emt_api_phase_seconds_count{{{labels}}} {s['count']}")
+
+        lines += [
+            "# HELP emt_api_calls_total EMT API calls by outcome.",
+            "# TYPE emt_api_calls_total counter",
+        ]
+        for (template, outcome), n in sorted(self.outcomes().items()):
+            lines.append(f'emt_api_calls_total{{endpoint="{_escape(template)}",outcome="{outcome}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide tracer used by ApiClient and BusModel
+tracer = Tracer()
+
+
+# ----------------------------------------------------
+# Transport instrumentation (connect / TLS timings)
+# ----------------------------------------------------
+class _TimedConnectionMixin:
+    """
+    Adds the time spent opening sockets (DNS + TCP) and in the TLS
+    handshake to the Trace open on the requesting thread.
+    """
+
+    tracer = tracer
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._socket_time = time.perf_counter() - start
+            trace = self.tracer.current()
+            if trace is not None:
+                trace.add("connect", self._socket_time)
+
+    def connect(self):
+        self._socket_time = 0.0
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            tls = time.perf_counter() - start - self._socket_time
+            trace = self.tracer.current()
+            if trace is not None and isinstance(self, HTTPSConnection):
+                trace.add("tls", tls)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def instrument_adapter(adapter):
+    """
+    Make a requests HTTPAdapter open connections that report their
+    connect / TLS time to the tracer.
+    """
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": TimedHTTPConnectionPool,
+        "https": TimedHTTPSConnectionPool,
+    }
+    return adapter
@@ -1,12 +1,63 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QLabel, QPushButton, QVBoxLayout,
-    QHBoxLayout, QFrame, QMessageBox, QListWidget, QListWidgetItem,
-    QGridLayout
+    QHBoxLayout, QFrame, QMessageBox, QListView, QGridLayout, QCheckBox,
+    QLineEdit, QCompleter
 )
+import importlib
+import os
+from datetime import datetime
 from PyQt6 import QtWidgets
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, QStringListModel
+from PyQt6.QtGui import QKeySequence, QShortcut
 from ui_mainwindow import Ui_MainWindow
-from map_window import MapWindow
+from catalog import line_code, line_id, line_color
+from list_models import Row, RowListModel, BadgeDelegate
+from workers import TaskRunner
+from scheduler import ArrivalsScheduler
+
+
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources.qss")
+
+# ms after first paint before the map stack is warmed up in the background
+MAP_WARMUP_DELAY = 1500
+
+# ms between attempts to load the line catalog after a failure
+CATALOG_RETRY_MS = 30000
+
+
+class ArrivalCard(QFrame):
+    """
+    One row of the arrivals panel (line badge, destination, ETA).
+    Looks come from resources.qss (#lineItem, #badge, #eta); only the
+    line color is set per badge, and only when it changes.
+    """
+
+    def __init__(self, line, destination):
+        super().__init__()
+        self.setObjectName("lineItem")
+        self.color = None
+
+        row = QHBoxLayout(self)
+
+        self.badge = QLabel(line)
+        self.badge.setObjectName("badge")
+        row.addWidget(self.badge)
+
+        row.addWidget(QLabel(destination), 5)
+
+        self.eta = QLabel()
+        self.eta.setObjectName("eta")
+        row.addWidget(self.eta, 0, Qt.AlignmentFlag.AlignRight)
+
+    def update_bus(self, bus):
+        if self.eta.text() != bus["eta"]:
+            self.eta.setText(bus["eta"])
+        self.set_color(bus["color"])
+
+    def set_color(self, color):
+        if self.color != color:
+            self.color = color
+            self.badge.setStyleSheet(f"background:{color};")
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
@@ -22,6 +73,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         super().__init__()
         self.model = model
 
+        # All model calls run in the background; results come back as signals
+        self.runner = TaskRunner(self)
+        self.runner.busyChanged.connect(self._on_busy_changed)
+
         # Build UI created in Qt Designer
         self.setupUi(self)
         self.tab1 = self.centralwidget
@@ -41,6 +96,28 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.recent_stops = []
 
+        # Tab 1 stop search by name / code
+        self._setup_stop_search()
+
+        # Tab 1 auto-refresh (kiosk mode)
+        self.scheduler = ArrivalsScheduler(model, self)
+        self.scheduler.arrivalsUpdated.connect(self._on_scheduled_arrivals)
+        self.scheduler.arrivalsFailed.connect(self._on_scheduled_failure)
+        self.current_stop = None
+        self._setup_auto_refresh()
+
+        # Single map window reused for every route (created on first use
+        # or by warm_up_map; QtWebEngine is not imported before that)
+        self.mapHost = None
+
+        # Map of the route currently being loaded (see _load_route)
+        self._route_shape = None
+        self._route_window = None
+
+        # Hidden API diagnostics window
+        self.debugPanel = None
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self._toggle_debug_panel)
+
     # ----------------------------------------------------
     # Fix references to widgets in Tab 1
     # ----------------------------------------------------
@@ -48,6 +125,109 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.scrollArea = self.tab1.findChild(QtWidgets.QScrollArea, "scrollArea")
         self.timestampLabel = self.tab1.findChild(QLabel, "timestampLabel")
         self.recentGrid = self.tab1.findChild(QGridLayout, "recentGrid")
+        self._setup_arrivals_panel()
+
+    # ----------------------------------------------------
+    # Tab 1 arrivals panel: persistent container, keyed cards
+    # ----------------------------------------------------
+    def _setup_arrivals_panel(self):
+        self.arrivalsPanel = self.scrollArea.widget()
+        self.arrivalsLayout = self.arrivalsPanel.layout()
+        self.arrivalsLayout.addStretch(1)
+
+        # Card styles are parsed once, for the whole panel
+        with open(STYLESHEET_PATH, "r", encoding="utf-8") as f:
+            self.arrivalsPanel.setStyleSheet(f.read())
+
+        self._arrival_cards = {}   # (line, destination, n) → ArrivalCard
+
+    # ----------------------------------------------------
+    # Stop search box above the stop number input
+    # ----------------------------------------------------
+    def _setup_stop_search(self):
+        self.stopSearch = QLineEdit()
+        self.stopSearch.setPlaceholderText("Buscar parada por nombre o número…")
+        self.stopSearch.setClearButtonEnabled(True)
+        self.leftColumn.insertWidget(self.leftColumn.indexOf(self.stopInput), self.stopSearch)
+
+        # The index does the matching; the completer only shows its results
+        self.stopSearchModel = QStringListModel(self)
+        self.stopCompleter = QCompleter(self.stopSearchModel, self)
+        self.stopCompleter.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.stopCompleter.setMaxVisibleItems(10)
+        self.stopCompleter.activated[str].connect(self._on_stop_search_chosen)
+        self.stopSearch.setCompleter(self.stopCompleter)
+        self.stopSearch.textEdited.connect(self._on_stop_search_edited)
+
+        self._stop_search_codes = {}   # completer text → stop code
+
+        # Stops of every route in the snapshot, loaded off the GUI thread
+        self.runner.submit("stop-index", self.model.load_stop_index)
+
+    def _on_stop_search_edited(self, text):
+        self._stop_search_codes = {}
+        for stop in self.model.search_stops(text):
+            label = f"{stop.code} · {stop.name}"
+            if stop.lines:
+                label += f"  ({', '.join(stop.lines)})"
+            self._stop_search_codes[label] = stop.code
+
+        self.stopSearchModel.setStringList(list(self._stop_search_codes))
+        if self._stop_search_codes:
+            self.stopCompleter.complete()
+
+    def _on_stop_search_chosen(self, label):
+        code = self._stop_search_codes.get(label)
+        if code is None:
+            return
+        # Leave the search box for the next query once the popup closes
+        QTimer.singleShot(0, self.stopSearch.clear)
+        self.stopInput.setText(code)
+        self.check_stop()
+
+    # ----------------------------------------------------
+    # Auto-refresh toggle under the lookup button
+    # ----------------------------------------------------
+    def _setup_auto_refresh(self):
+        self.autoRefreshCheck = QCheckBox("Actualizar automáticamente")
+        self.leftColumn.insertWidget(self.leftColumn.indexOf(self.checkButton) + 1,
+                                     self.autoRefreshCheck)
+        self.autoRefreshCheck.toggled.connect(self._on_auto_refresh_toggled)
+
+    def _on_auto_refresh_toggled(self, enabled):
+        if self.current_stop is None:
+            return
+        if enabled:
+            self.scheduler.watch(self.current_stop)
+        else:
+            self.scheduler.unwatch(self.current_stop)
+
+    def _set_current_stop(self, stop):
+        """
+        Move the auto-refresh watch to the stop now on screen.
+        """
+        if stop == self.current_stop:
+            return
+
+        if self.autoRefreshCheck.isChecked():
+            if self.current_stop is not None:
+                self.scheduler.unwatch(self.current_stop)
+            self.scheduler.watch(stop)
+        self.current_stop = stop
+
+    def _on_scheduled_arrivals(self, stop, result):
+        if stop == self.current_stop:
+            self.show_arrivals(result)
+
+    def _on_scheduled_failure(self, stop, error):
+        # No modal dialogs from background refreshes
+        if stop != self.current_stop:
+            return
+        if isinstance(error, LookupError):
+            # No buses any more: the last cards would show ETAs that have passed
+            self._clear_arrivals()
+            self.timestampLabel.setText(f"Sin llegadas previstas ({error})")
+        self.statusBar().showMessage(f"Error al actualizar la parada {stop}: {error}", 5000)
 
     # ----------------------------------------------------
     # Tabs container
@@ -77,78 +257,163 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         lbl_right.setStyleSheet("font-size:16px; font-weight:700;")
         titles.addWidget(lbl_right)
 
-        # Two list widgets
+        # Offline / unconfirmed snapshot notice
+        self.dataStatusLabel = QLabel()
+        self.dataStatusLabel.setStyleSheet("color:#f59e0b; font-style:italic;")
+        self.dataStatusLabel.hide()
+        layout.addWidget(self.dataStatusLabel)
+
+        # Two model-backed lists; rows are painted by BadgeDelegate
         content = QHBoxLayout()
         layout.addLayout(content)
 
-        self.linesList = QListWidget()
-        self.directionsList = QListWidget()
-        content.addWidget(self.linesList)
-        content.addWidget(self.directionsList)
-
-        # Load EMT lines
-        try:
-            self.lines_data = self.model.api.get_lines_raw()
-        except Exception as e:
-            QMessageBox.critical(self, "API Error", str(e))
-            self.lines_data = []
+        self.linesModel = RowListModel(self)
+        self.directionsModel = RowListModel(self)
+        self.rowDelegate = BadgeDelegate(self)
+
+        self.linesList = QListView()
+        self.directionsList = QListView()
+        for view, model in ((self.linesList, self.linesModel),
+                            (self.directionsList, self.directionsModel)):
+            view.setModel(model)
+            view.setItemDelegate(self.rowDelegate)
+            view.setUniformItemSizes(True)
+            content.addWidget(view)
+
+        # Lines may come from the on-disk snapshot: follow its revalidation
+        self.dataStatusTimer = QTimer(self)
+        self.dataStatusTimer.setInterval(1000)
+        self.dataStatusTimer.timeout.connect(self._refresh_data_status)
+
+        # Offline: ask for /lines/ again every STALE_RETRY seconds, which
+        # re-issues the revalidation once the stale copy's memory-cache
+        # lifetime is over
+        self.dataRetryTimer = QTimer(self)
+        self.dataRetryTimer.setSingleShot(True)
+        self.dataRetryTimer.setInterval(self.model.api.STALE_RETRY * 1000)
+        self.dataRetryTimer.timeout.connect(self._retry_revalidation)
+        self._lines_stale = False
+
+        # EMT lines, shared with the model. The window paints first; the
+        # list (and Tab 1 badge colors) fill in when the catalog lands.
+        self.lines_data = []
+        self._catalog_failed = False
+        self._load_catalog()
 
+        # Click handlers
+        self.linesList.clicked.connect(self._on_line_clicked)
+        self.directionsList.clicked.connect(self._on_direction_clicked)
+
+    def _load_catalog(self):
+        self._show_lines_message("Cargando líneas…")
+        self.runner.submit(
+            "catalog", self.model.wait_catalog,
+            on_done=self._on_catalog_loaded,
+            on_error=self._on_catalog_failed,
+        )
+
+    def _on_catalog_loaded(self, catalog):
+        self.lines_data = catalog.lines
         self._populate_lines()
+        self._recolor_arrivals()
+        self._refresh_data_status()
 
-        # Click handlers
-        self.linesList.itemClicked.connect(self._on_line_clicked)
-        self.directionsList.itemClicked.connect(self._on_direction_clicked)
+    def _on_catalog_failed(self, error):
+        self._show_lines_message("No se pudieron cargar las líneas · reintentando…")
+        if not self._catalog_failed:
+            QMessageBox.critical(self, "API Error", str(error))
+        self._catalog_failed = True
+        QTimer.singleShot(CATALOG_RETRY_MS, self._load_catalog)
+
+    def _show_lines_message(self, text):
+        self.linesModel.set_rows([Row(text)])
+
+    def _recolor_arrivals(self):
+        """
+        Arrivals shown before the catalog loaded have placeholder colors.
+        """
+        for card in self._arrival_cards.values():
+            card.set_color(self.model.catalog.color_for(card.badge.text()))
+
+    # ----------------------------------------------------
+    # Snapshot status (stale-but-labelled data)
+    # ----------------------------------------------------
+    def _refresh_data_status(self):
+        """
+        Label the lines list while it is served from disk, and reload it
+        if background revalidation brought a newer copy.
+        """
+        api = self.model.api
+        stale_since = api.stale_since("/lines/")
+        was_stale, self._lines_stale = self._lines_stale, stale_since is not None
+
+        if stale_since is None:
+            self.dataStatusLabel.hide()
+        else:
+            when = datetime.fromtimestamp(stale_since).strftime("%d/%m/%Y %H:%M")
+            if api.is_revalidating("/lines/"):
+                text = f"Datos guardados del {when} · comprobando actualizaciones…"
+            else:
+                text = f"Sin conexión · datos guardados del {when}"
+            self.dataStatusLabel.setText(text)
+            self.dataStatusLabel.show()
+
+        if api.is_revalidating("/lines/"):
+            self.dataRetryTimer.stop()
+            self.dataStatusTimer.start()
+            return
+
+        self.dataStatusTimer.stop()
+
+        # Revalidation failed (offline): try again later
+        if stale_since is not None:
+            if not self.dataRetryTimer.isActive():
+                self.dataRetryTimer.start()
+            return
+        self.dataRetryTimer.stop()
+
+        # Revalidation just confirmed the data: show the fresh copy
+        if was_stale and self.model.reload_catalog():
+            self.lines_data = self.model.catalog.lines
+            self._populate_lines()
+
+    def _retry_revalidation(self):
+        self.runner.submit(
+            "lines-revalidate", self.model.reload_catalog,
+            on_done=self._on_revalidation_retried,
+            on_error=lambda _: self._refresh_data_status(),
+        )
+
+    def _on_revalidation_retried(self, changed):
+        if changed:
+            self.lines_data = self.model.catalog.lines
+            self._populate_lines()
+        self._refresh_data_status()
 
     # ----------------------------------------------------
     # Helpers to extract fields from line dicts
     # ----------------------------------------------------
     def _extract_line_code(self, line):
-        return line.get("code") or line.get("shortName") or "?"
+        return line_code(line) or "?"
 
     def _extract_line_id(self, line):
-        # Numeric ID used by EMT line endpoints
-        return line.get("id") or line.get("routeGtfsId")
+        return line_id(line)
 
     # ----------------------------------------------------
     # Left column: Lines list
     # ----------------------------------------------------
     def _populate_lines(self):
-        self.linesList.clear()
+        rows = []
 
         for idx, line in enumerate(self.lines_data):
-            code = self._extract_line_code(line)
-            name = line.get("name", "")
+            rows.append(Row(
+                text=line.get("name", ""),
+                badge=self._extract_line_code(line),
+                color=line_color(line, "#999999"),
+                payload=idx,
+            ))
 
-            # Color logic (Tab 2 badge)
-            raw_color = line.get("color")
-            if raw_color and raw_color.startswith("#"):
-                color = raw_color
-            else:
-                rc = line.get("routeColor")
-                color = f"#{rc}" if rc else "#999999"
-
-            # Visual row
-            widget = QWidget()
-            h = QHBoxLayout(widget)
-            h.setContentsMargins(6, 4, 6, 4)
-
-            badge = QLabel(code)
-            badge.setStyleSheet(
-                f"background:{color}; color:white;"
-                "padding:6px 12px; border-radius:6px; font-weight:700;"
-            )
-            h.addWidget(badge)
-
-            label = QLabel(name)
-            label.setStyleSheet("font-weight:600; padding-left:10px;")
-            h.addWidget(label)
-
-            item = QListWidgetItem()
-            item.setSizeHint(widget.sizeHint())
-            item.setData(Qt.ItemDataRole.UserRole, idx)
-
-            self.linesList.addItem(item)
-            self.linesList.setItemWidget(item, widget)
+        self.linesModel.set_rows(rows)
 
     # ----------------------------------------------------
     # Right column — Sublines (first level)
@@ -158,42 +423,27 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Show sublines of a selected line.
         Each item is clickable and will load directions.
         """
-        self.directionsList.clear()
         line_code = self._extract_line_code(line)
         line_id = self._extract_line_id(line)
 
         if not sublines:
-            lbl = QLabel("<b>No hay sublíneas para esta línea.</b>")
-            item = QListWidgetItem()
-            item.setSizeHint(lbl.sizeHint())
-            self.directionsList.addItem(item)
-            self.directionsList.setItemWidget(item, lbl)
+            self._show_list_message("No hay sublíneas para esta línea.")
             return
 
+        rows = []
         for sub in sublines:
             name = sub.get("longName", "Sublínea")
             sid = sub.get("subLineId")
 
-            widget = QWidget()
-            v = QVBoxLayout(widget)
-            v.setContentsMargins(6, 4, 6, 4)
-
-            t = QLabel(f"<b>{line_code} — {name}</b>")
-            v.addWidget(t)
-
-            item = QListWidgetItem()
-            item.setSizeHint(widget.sizeHint())
-
             # We keep line code, line ID and subline ID for the next click
-            item.setData(Qt.ItemDataRole.UserRole, {
+            rows.append(Row(f"{line_code} — {name}", payload={
                 "type": "subline",
                 "line": line_code,
                 "line_id": line_id,
                 "subline_id": sid
-            })
+            }))
 
-            self.directionsList.addItem(item)
-            self.directionsList.setItemWidget(item, widget)
+        self.directionsModel.set_rows(rows)
 
     # ----------------------------------------------------
     # Right column — Directions (second level)
@@ -203,51 +453,61 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Show directions (headSigns) for a chosen subline.
         Direction items are the ones that open the map.
         """
-        self.directionsList.clear()
-
         if not directions:
-            lbl = QLabel("<b>No hay direcciones para esta sublínea.</b>")
-            item = QListWidgetItem()
-            item.setSizeHint(lbl.sizeHint())
-            self.directionsList.addItem(item)
-            self.directionsList.setItemWidget(item, lbl)
+            self._show_list_message("No hay direcciones para esta sublínea.")
             return
 
+        rows = []
         for d in directions:
             head = d.get("headSign", "Destino")
             trip = d.get("tripId")
 
-            widget = QWidget()
-            v = QVBoxLayout(widget)
-            v.setContentsMargins(6, 4, 6, 4)
-
-            t = QLabel(f"<b>{line_code} → {head}</b>")
-            v.addWidget(t)
-
-            item = QListWidgetItem()
-            item.setSizeHint(widget.sizeHint())
-
             # Store all info needed to fetch route + open map
-            item.setData(Qt.ItemDataRole.UserRole, {
+            rows.append(Row(f"{line_code} → {head}", payload={
                 "type": "direction",
                 "line": line_code,
                 "line_id": line_id,
                 "direction": head,
                 "trip_id": trip
-            })
+            }))
+
+        self.directionsModel.set_rows(rows)
+
+    def _show_list_message(self, text):
+        """
+        Replace the right column with a single non-clickable message.
+        """
+        self.directionsModel.set_rows([Row(text)])
 
-            self.directionsList.addItem(item)
-            self.directionsList.setItemWidget(item, widget)
+    # ----------------------------------------------------
+    # Background requests: loading state
+    # ----------------------------------------------------
+    def _on_busy_changed(self, channel, busy):
+        if channel == "arrivals":
+            self.checkButton.setText("Cargando…" if busy else "Consultar parada")
+        elif any(self.runner.is_busy(c) for c in ("tab2", "route-stops", "route-shape")):
+            self.statusBar().showMessage("Cargando datos de EMT…")
+        else:
+            self.statusBar().clearMessage()
+
+    def _show_error(self, title):
+        """
+        Error callback for background requests.
+        """
+        return lambda e: QMessageBox.critical(self, title, str(e))
 
     # ----------------------------------------------------
     # TAB 2 click handling
     # ----------------------------------------------------
-    def _on_line_clicked(self, item):
+    def _on_line_clicked(self, index):
         """
         First click: user selects a line.
         → We load sublines of that line.
         """
-        idx = item.data(Qt.ItemDataRole.UserRole)
+        idx = index.data(Qt.ItemDataRole.UserRole)
+        if idx is None:
+            # Message row ("Cargando líneas…")
+            return
         line = self.lines_data[idx]
 
         line_id = self._extract_line_id(line)
@@ -255,21 +515,21 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             QMessageBox.warning(self, "Error", "No line ID found for this line.")
             return
 
-        try:
-            sublines = self.model.get_sublines(line_id)
-        except Exception as e:
-            QMessageBox.critical(self, "Error al cargar sublíneas", str(e))
-            return
-
-        self._populate_sublines(sublines, line)
+        # A newer click in Tab 2 supersedes this request
+        self._show_list_message("Cargando sublíneas…")
+        self.runner.submit(
+            "tab2", self.model.get_sublines, line_id,
+            on_done=lambda sublines: self._populate_sublines(sublines, line),
+            on_error=self._show_error("Error al cargar sublíneas"),
+        )
 
-    def _on_direction_clicked(self, item):
+    def _on_direction_clicked(self, index):
         """
         Two possible clicks in the right list:
         - Click on SUBLINE  → we load directions.
         - Click on DIRECTION → we fetch route data and open map.
         """
-        data = item.data(Qt.ItemDataRole.UserRole)
+        data = index.data(Qt.ItemDataRole.UserRole)
         if not isinstance(data, dict):
             return
 
@@ -281,13 +541,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             line_code = data["line"]
             line_id = data.get("line_id")
 
-            try:
-                directions = self.model.get_directions(sid)
-            except Exception as e:
-                QMessageBox.critical(self, "Error al cargar direcciones", str(e))
-                return
-
-            self._populate_directions(directions, line_code, line_id)
+            self._show_list_message("Cargando direcciones…")
+            self.runner.submit(
+                "tab2", self.model.get_directions, sid,
+                on_done=lambda directions: self._populate_directions(
+                    directions, line_code, line_id),
+                on_error=self._show_error("Error al cargar direcciones"),
+            )
             return
 
         # Second level: direction → fetch stops + shape + open map
@@ -301,21 +561,82 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                 QMessageBox.warning(self, "Error", "Datos de línea o viaje incompletos.")
                 return
 
-            try:
-                stops = self.model.get_route_stops(line_id, trip_id)
-                shape = self.model.get_route_shape(line_id, trip_id)
-            except Exception as e:
-                QMessageBox.critical(self, "Error al cargar datos de mapa", str(e))
-                return
+            self._load_route(line_code, line_id, trip_id)
 
-            if not stops:
-                QMessageBox.warning(self, "Sin paradas", "No se han encontrado paradas para esta ruta.")
-                return
+    # ----------------------------------------------------
+    # MAP — stops and shape are fetched in parallel
+    # ----------------------------------------------------
+    def _load_route(self, line_code, line_id, trip_id):
+        """
+        Request stops and shape at the same time. The map opens as soon
+        as the stops arrive; the polyline is added when the shape lands.
+        """
+        self._route_shape = None
+        self._route_window = None
+
+        self.runner.submit(
+            "route-stops", self.model.get_route_stops, line_id, trip_id,
+            on_done=lambda stops: self._open_map(line_code, stops, self._route_shape),
+            on_error=self._show_error("Error al cargar datos de mapa"),
+        )
+        self.runner.submit(
+            "route-shape", self.model.get_route_shape, line_id, trip_id,
+            on_done=self._on_route_shape,
+            on_error=lambda e: self.statusBar().showMessage(
+                f"No se pudo cargar el trazado de la ruta: {e}", 5000),
+        )
+
+    def _on_route_shape(self, shape):
+        if self.runner.is_busy("route-stops"):
+            # Map not open yet: it will be drawn with the stops
+            self._route_shape = shape
+        elif self._route_window is not None:
+            self._route_window.set_shape(shape)
+
+    def _open_map(self, line_code, stops, shape):
+        if not stops:
+            QMessageBox.warning(self, "Sin paradas", "No se han encontrado paradas para esta ruta.")
+            return
+
+        # Reuse the map window: switching routes is a message, not a page load
+        self._ensure_map_host()
+        self.mapHost.show_route(line_code, stops, shape)
+        self.mapHost.show()
+        self.mapHost.raise_()
+        self._route_window = self.mapHost
+
+    def _ensure_map_host(self):
+        if self.mapHost is None:
+            from map_host import MapHost   # pulls in QtWebEngine
+            self.mapHost = MapHost()
+            self.mapHost.bridge.stopSelected.connect(self._on_map_stop_selected)
+
+    def warm_up_map(self, delay=MAP_WARMUP_DELAY):
+        """
+        After first paint: import the map stack on a worker thread, then
+        create the (hidden) map window so the first route opens instantly.
+        Disabled with EMT_MAP_WARMUP=0.
+        """
+        if os.environ.get("EMT_MAP_WARMUP", "1") == "0":
+            return
+        QTimer.singleShot(delay, lambda: self.runner.submit(
+            "map-warmup", importlib.import_module, "map_host",
+            on_done=lambda _: self._ensure_map_host(),
+        ))
 
-            # Open map window with real EMT data
-            self.mapWindow = MapWindow(line_code, stops, shape)
-            self.mapWindow.bridge.stopSelected.connect(self._on_map_stop_selected)
-            self.mapWindow.show()
+    # ----------------------------------------------------
+    # Debug panel (Ctrl+Shift+D)
+    # ----------------------------------------------------
+    def _toggle_debug_panel(self):
+        if self.debugPanel is None:
+            from debug_panel import DebugPanel
+            self.debugPanel = DebugPanel(self.model)
+
+        if self.debugPanel.isVisible():
+            self.debugPanel.hide()
+        else:
+            self.debugPanel.show()
+            self.debugPanel.raise_()
 
     # ----------------------------------------------------
     # TAB 1 — Stop lookup
@@ -327,40 +648,54 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             QMessageBox.warning(self, "Error", "Enter stop number.")
             return
 
-        try:
-            result = self.model.fetch_arrivals(stop)
-            self.show_arrivals(result)
-            self.add_to_history(stop)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.runner.submit(
+            "arrivals", self.model.fetch_arrivals, stop,
+            on_done=lambda result: self._on_arrivals_loaded(stop, result),
+            on_error=self._show_error("Error"),
+        )
+
+    def _on_arrivals_loaded(self, stop, result):
+        self.show_arrivals(result)
+        self.add_to_history(stop)
+        self._set_current_stop(stop)
 
     def show_arrivals(self, result):
         """
         Render arrivals cards in the scroll area for Tab 1.
+        Cards are keyed by line + destination and reused across
+        refreshes: only ETA text, order and added/removed rows change.
         """
-        layout = QVBoxLayout()
-
-        for bus in result["data"]:
-            card = QFrame()
-            row = QHBoxLayout(card)
-
-            badge = QLabel(bus["line"])
-            badge.setStyleSheet(
-                f"background:{bus['color']}; color:black;"
-                "padding:4px 10px; font-weight:700;"
-            )
-            row.addWidget(badge)
-
-            row.addWidget(QLabel(bus["destination"]), 5)
-            row.addWidget(QLabel(bus["eta"]), 0, Qt.AlignmentFlag.AlignRight)
-
-            layout.addWidget(card)
+        layout = self.arrivalsLayout
+        seen = {}
+        keys = []
+
+        for index, bus in enumerate(result["data"]):
+            # Several buses of one line to the same destination
+            base = (bus["line"], bus["destination"])
+            seen[base] = seen.get(base, 0) + 1
+            key = base + (seen[base],)
+            keys.append(key)
+
+            card = self._arrival_cards.get(key)
+            if card is None:
+                card = ArrivalCard(bus["line"], bus["destination"])
+                self._arrival_cards[key] = card
+
+            card.update_bus(bus)
+            if layout.indexOf(card) != index:
+                layout.insertWidget(index, card)
+
+        self._remove_cards(set(self._arrival_cards) - set(keys))
+        self.timestampLabel.setText(f"Last updated: {result['timestamp']}")
 
-        container = QWidget()
-        container.setLayout(layout)
-        self.scrollArea.setWidget(container)
+    def _clear_arrivals(self):
+        self._remove_cards(list(self._arrival_cards))
 
-        self.timestampLabel.setText(f"Last updated: {result['timestamp']}")
+    def _remove_cards(self, keys):
+        for key in keys:
+            card = self._arrival_cards.pop(key)
+            self.arrivalsLayout.removeWidget(card)
+            card.deleteLater()
 
     def add_to_history(self, stop):
         """
@@ -393,7 +728,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     # ----------------------------------------------------
     def _on_map_stop_selected(self, stop_id: str):
         """
-        Called by the MapWindow when user presses
+        Called by the map window when user presses
         'Consultar parada' on a marker popup.
         """
         self.tabWidget.setCurrentIndex(0)
@@ -0,0 +1,189 @@
+import itertools
+import mimetypes
+import os
+import re
+
+from PyQt6.QtCore import QBuffer, QIODevice, QUrl, pyqtSignal
+from PyQt6.QtWebEngineCore import (
+    QWebEngineProfile, QWebEngineSettings, QWebEngineUrlRequestJob,
+    QWebEngineUrlScheme, QWebEngineUrlSchemeHandler,
+)
+
+from tile_cache import TileCache
+
+
+SCHEME = b"emt"
+HOST = "app"
+
+# Vendored front-end files (Leaflet), served at emt://app/assets/...
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ASSETS_PREFIX = "/assets/"
+
+# Map tiles, served from the local TileCache at emt://app/tiles/{z}/{x}/{y}.png
+TILES_PREFIX = "/tiles/"
+TILE_PATH = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)\.png$")
+
+
+def register_scheme():
+    """
+    Declare the emt:// scheme. Must run before QApplication is created.
+    Pages served from it may load https resources and qrc:// files
+    (qwebchannel.js).
+    """
+    scheme = QWebEngineUrlScheme(SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalAccessAllowed
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+class AppSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serves in-memory documents at emt://app/<path>.
+    Nothing is written to disk, and every page has its own path, so
+    several map windows never share a file.
+
+    Also serves the bundled assets/ directory at emt://app/assets/,
+    read from disk once and kept in memory for the whole session, and
+    map tiles from a TileCache (network only on a cache miss).
+    """
+
+    # Tile fetched on a worker thread: (job id, bytes or None)
+    tileFetched = pyqtSignal(int, object)
+
+    def __init__(self, parent=None, tiles=None):
+        super().__init__(parent)
+        self._resources = {}   # path → (bytes, mime type)
+        self._assets = {}      # path → (bytes, mime type), never evicted
+
+        self.tiles = tiles
+        self._tile_jobs = {}   # job id → QWebEngineUrlRequestJob waiting for a tile
+        self._job_ids = itertools.count(1)
+        self.tileFetched.connect(self._on_tile_fetched)
+
+    def add(self, path, data, mime=b"text/html"):
+        """
+        Publish bytes at a path and return the URL to load.
+        """
+        self._resources[path] = (bytes(data), mime)
+        return url_for(path)
+
+    def remove(self, path):
+        self._resources.pop(path, None)
+
+    def _asset(self, path):
+        """
+        Bundled file for an /assets/ path, or None.
+        """
+        entry = self._assets.get(path)
+        if entry is not None:
+            return entry
+
+        rel = os.path.normpath(path[len(ASSETS_PREFIX):])
+        if rel.startswith("..") or os.path.isabs(rel):
+            return None
+
+        file_path = os.path.join(ASSETS_DIR, rel)
+        if not os.path.isfile(file_path):
+            return None
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+        mime = (mimetypes.guess_type(file_path)[0] or "application/octet-stream").encode()
+
+        entry = self._assets[path] = (data, mime)
+        return entry
+
+    def requestStarted(self, job):
+        path = job.requestUrl().path()
+        if path.startswith(TILES_PREFIX):
+            self._serve_tile(job, path)
+            return
+
+        if path.startswith(ASSETS_PREFIX):
+            entry = self._asset(path)
+        else:
+            entry = self._resources.get(path)
+
+        if entry is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+
+        self._reply(job, *entry)
+
+    @staticmethod
+    def _reply(job, data, mime):
+        buf = QBuffer(parent=job)
+        buf.setData(data)
+        buf.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(mime, buf)
+
+    # ----------------------------------------------------
+    # Tiles
+    # ----------------------------------------------------
+    def _serve_tile(self, job, path):
+        match = TILE_PATH.match(path)
+        if match is None or self.tiles is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+
+        z, x, y = map(int, match.groups())
+        data = self.tiles.get(z, x, y)
+        if data is not None:
+            self._reply(job, data, b"image/png")
+            return
+
+        # Miss: download off the GUI thread, answer when it lands
+        job_id = next(self._job_ids)
+        self._tile_jobs[job_id] = job
+        job.destroyed.connect(lambda: self._tile_jobs.pop(job_id, None))
+
+        future = self.tiles.fetch_async(z, x, y)
+        future.add_done_callback(
+            lambda f: self.tileFetched.emit(job_id, None if f.cancelled() else f.result())
+        )
+
+    def _on_tile_fetched(self, job_id, data):
+        job = self._tile_jobs.pop(job_id, None)
+        if job is None:
+            return   # page went away meanwhile
+        if data is None:
+            job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+        else:
+            self._reply(job, data, b"image/png")
+
+
+def url_for(path):
+    return QUrl(f"{SCHEME.decode()}://{HOST}{path}")
+
+
+_handler = None
+
+
+def configure_profile(profile):
+    """
+    WebEngine: allow JS + allow app pages to load Leaflet and injected
+    JavaScript. Without these, the map stays white or fails silently.
+    """
+    settings = profile.settings()
+    settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.AllowRunningInsecureContent, True)
+
+
+def scheme_handler():
+    """
+    The application's handler, installed on the default profile on first
+    use. The profile is configured at the same time, so nothing WebEngine
+    related happens at startup beyond register_scheme().
+    """
+    global _handler
+    if _handler is None:
+        profile = QWebEngineProfile.defaultProfile()
+        configure_profile(profile)
+        _handler = AppSchemeHandler(profile, tiles=TileCache())
+        profile.installUrlSchemeHandler(SCHEME, _handler)
+    return _handler
@@ -0,0 +1,138 @@
+import itertools
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class _TaskSignals(QObject):
+    """
+    Signals of a Task. Created in the GUI thread, so emitting them
+    from a pool thread queues the delivery back to the GUI thread.
+    """
+
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class Task(QRunnable):
+    """
+    One blocking call (usually a BusModel method) run on a QThreadPool.
+    """
+
+    def __init__(self, task_id, fn, args, kwargs):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _TaskSignals()
+
+        # Python owns the task (TaskRunner keeps it until its signal is
+        # delivered): an auto-deleted task could be gone by the time
+        # cancel() calls tryTake on it
+        self.setAutoDelete(False)
+
+    def run(self):
+        # Superseded while still queued: skip the request entirely
+        # (still signal, so TaskRunner releases the task)
+        if self.cancelled:
+            self.signals.finished.emit(self.task_id, None)
+            return
+
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.task_id, e)
+        else:
+            self.signals.finished.emit(self.task_id, result)
+
+
+class TaskRunner(QObject):
+    """
+    Runs model calls off the GUI thread and hands results back to
+    callbacks on the GUI thread.
+
+    Requests are grouped in channels ("arrivals", "tab2"…): submitting
+    to a channel supersedes its previous request, whose result is
+    dropped (or never fetched, if it had not started yet).
+    """
+
+    busyChanged = pyqtSignal(str, bool)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._ids = itertools.count(1)
+        self._current = {}   # channel → Task
+        self._pending = {}   # task_id → (channel, on_done, on_error)
+        self._tasks = {}     # task_id → Task, until it has signalled
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the pool.
+        on_done(result) / on_error(exception) are called on the GUI thread.
+        """
+        self.cancel(channel, notify=False)
+
+        task = Task(next(self._ids), fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+
+        self._current[channel] = task
+        self._pending[task.task_id] = (channel, on_done, on_error)
+        self._tasks[task.task_id] = task
+
+        self.pool.start(task)
+        self.busyChanged.emit(channel, True)
+        return task
+
+    def cancel(self, channel, notify=True):
+        """
+        Drop the in-flight request of a channel, if any.
+        """
+        task = self._current.pop(channel, None)
+        if task is None:
+            return
+
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            # Never ran, so it will not signal
+            self._tasks.pop(task.task_id, None)
+        self._pending.pop(task.task_id, None)
+
+        if notify:
+            self.busyChanged.emit(channel, False)
+
+    def is_busy(self, channel):
+        return channel in self._current
+
+    # ----------------------------------------------------
+    # Delivery (GUI thread)
+    # ----------------------------------------------------
+    def _take(self, task_id):
+        """
+        Return the callbacks of a finished task, or None if superseded.
+        """
+        self._tasks.pop(task_id, None)
+        entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return None
+
+        channel = entry[0]
+        self._current.pop(channel, None)
+        self.busyChanged.emit(channel, False)
+        return entry
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, task_id, result):
+        entry = self._take(task_id)
+        if entry and entry[1]:
+            entry[1](result)
+
+    @pyqtSlot(int, object)
+    def _on_failed(self, task_id, error):
+        entry = self._take(task_id)
+        if entry and entry[2]:
+            entry[2](error)